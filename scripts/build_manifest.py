@@ -0,0 +1,8 @@
+"""scripts/build_manifest.py"""
+
+import staging
+from pipeline import registry
+
+
+if __name__ == "__main__":
+    print(f"Wrote {registry.write_manifest(staging)}")
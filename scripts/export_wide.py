@@ -0,0 +1,29 @@
+"""scripts/export_wide.py"""
+
+import argparse
+
+from utils import environ
+from warehouse import export
+
+
+def export_wide(hierarchy: bool = True):
+    env = environ.create_env()
+    export.export_wide(env.staged_data, env.exports, hierarchy=hierarchy)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Export staged facts as a wide LA x period x code matrix."
+    )
+    parser.add_argument(
+        "--no-hierarchy",
+        dest="hierarchy",
+        action="store_false",
+        help="Leave out the LA hierarchy attribute columns.",
+    )
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    export_wide(hierarchy=args.hierarchy)
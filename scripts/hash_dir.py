@@ -1,23 +1,74 @@
+import argparse
+from functools import partial
 from pathlib import Path
 
+from pipeline.runner import FINGERPRINT_CACHE_NAME
 from utils import file_handler as fh
 from utils.environ import create_env
+from utils.fingerprint import FingerprintCache
 
 
 env = create_env()
 
 
-def hash_directory(source_dir: str) -> dict[str, str]:
+def hash_directory(
+    source_dir: str,
+    fingerprints: FingerprintCache | None = None,
+    algorithm: fh.HashAlgorithm = "sha256",
+    workers: int | None = None,
+) -> dict[str, str]:
     source_dir_path = Path(source_dir)
     if not source_dir_path.is_dir():
         raise ValueError(f"Source directory '{source_dir}' is not a directory.")
 
-    file_hashes = {}
-    for item in sorted(source_dir_path.iterdir()):
-        file_hashes[item.name] = fh.hash_file(item)
+    # The fingerprint cache only holds sha256 digests.
+    lookup = None
+    if fingerprints is not None and algorithm == "sha256":
+        hash_file, lookup = fingerprints.hash_file, fingerprints.lookup
+    else:
+        hash_file = partial(fh.hash_file, algorithm=algorithm)
+    report = fh.hash_files(
+        sorted(item for item in source_dir_path.iterdir() if item.is_file()),
+        hash_file,
+        workers,
+        lookup,
+    )
+    print(
+        f"Hashed {report.n_hashed} of {len(report.digests)} files "
+        f"({report.n_bytes / 2**20:.1f} MB) in {report.seconds:.2f}s: "
+        f"{report.mb_per_s:.0f} MB/s"
+    )
 
-    return file_hashes
+    return {path.name: file_hash for path, file_hash in report.digests.items()}
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Hash every file in raw_data.")
+    parser.add_argument(
+        "--verify",
+        action="store_true",
+        help="Ignore cached fingerprints and re-hash every file.",
+    )
+    parser.add_argument(
+        "--algorithm",
+        choices=["sha256", "blake2b"],
+        default="sha256",
+        help="Digest to compute; registry keys are sha256 (default: sha256).",
+    )
+    parser.add_argument(
+        "-w",
+        "--workers",
+        type=int,
+        default=None,
+        help="Number of hashing threads (default: one per CPU, at most 8).",
+    )
+    return parser.parse_args()
 
 
 if __name__ == "__main__":
-    print(hash_directory(env.raw_data))
+    args = parse_args()
+    fingerprints = FingerprintCache(
+        Path(env.staged_data) / FINGERPRINT_CACHE_NAME, verify=args.verify
+    )
+    print(hash_directory(env.raw_data, fingerprints, args.algorithm, args.workers))
+    fingerprints.save()
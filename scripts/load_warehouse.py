@@ -0,0 +1,15 @@
+"""scripts/load_warehouse.py"""
+
+from utils import environ
+from warehouse import derived, loader, rollup
+
+
+def load_warehouse():
+    env = environ.create_env()
+    loader.load_staged_files(env.staged_data, env.warehouse)
+    rollup.build_rollups(env.warehouse)
+    derived.refresh_derived(env.warehouse)
+
+
+if __name__ == "__main__":
+    load_warehouse()
@@ -0,0 +1,32 @@
+"""scripts/merge_run_reports.py"""
+
+import argparse
+
+from pipeline import log
+from pipeline import report
+from pipeline.outcome import Outcome
+from utils import environ
+
+
+def merge_run_reports(run_id: str):
+    env = environ.create_env()
+    run_report = report.merge_reports(env.staged_data, run_id)
+    log.log_staging_completed(
+        [Outcome(entry["outcome"]) for entry in run_report["files"]]
+    )
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Merge the worker reports of a staging run into one report."
+    )
+    parser.add_argument(
+        "run_id",
+        help="The --run-id the stage_files.py workers were given.",
+    )
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    merge_run_reports(args.run_id)
@@ -0,0 +1,103 @@
+"""scripts/run_benchmark.py"""
+
+import argparse
+import json
+import sys
+import tempfile
+
+from benchmark import generator, harness
+
+
+def run_benchmark(
+    output: str,
+    generator_options: generator.GeneratorOptions,
+    options: harness.BenchmarkOptions,
+    data_dir: str | None = None,
+    baseline: str | None = None,
+    tolerance: float = 0.2,
+) -> int:
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        report = harness.run_benchmarks(data_dir or tmp_dir, generator_options, options)
+    harness.write_results(report, output)
+
+    for result in report["results"]:
+        print(
+            f"{result['module']:<28} {result['phase']:<10} {result['rows']:>9} rows "
+            f"{result['seconds_min'] * 1000:>9.1f}ms {result['peak_rss_mb']:>8.1f}MB"
+        )
+
+    if baseline is None:
+        return 0
+
+    with open(baseline) as f:
+        regressions = harness.compare(json.load(f), report, tolerance)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+
+    return 1 if regressions else 0
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Benchmark staging phases on synthetic workbooks."
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        default="benchmark.json",
+        help="Where to write the JSON results (default: benchmark.json).",
+    )
+    parser.add_argument(
+        "--data-dir",
+        help="Keep the generated workbooks here (default: a temporary directory).",
+    )
+    parser.add_argument("--las", type=int, default=360, help="Local authorities.")
+    parser.add_argument("--years", type=int, default=15, help="Year columns.")
+    parser.add_argument(
+        "--sheets",
+        type=int,
+        default=None,
+        help="Sheets per workbook (default: each module's own count).",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--validation", choices=["native", "pandera"], default="native")
+    parser.add_argument(
+        "--format", dest="output_format", choices=["parquet", "ipc"], default="parquet"
+    )
+    parser.add_argument(
+        "--baseline",
+        help="Compare against an earlier results file; exit 1 on regressions.",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.2,
+        help="Allowed slowdown against the baseline (default: 0.2, i.e. 20%%).",
+    )
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    generator_options = generator.GeneratorOptions(
+        n_local_authorities=args.las,
+        n_years=args.years,
+        n_sheets=args.sheets,
+        seed=args.seed,
+    )
+    options = harness.BenchmarkOptions(
+        repeats=args.repeats,
+        validation=args.validation,
+        output_format=args.output_format,
+    )
+    sys.exit(
+        run_benchmark(
+            args.output,
+            generator_options,
+            options,
+            data_dir=args.data_dir,
+            baseline=args.baseline,
+            tolerance=args.tolerance,
+        )
+    )
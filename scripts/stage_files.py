@@ -1,16 +1,191 @@
 """scripts/stage_files.py"""
 
+import argparse
+from datetime import UTC, datetime
+from pathlib import Path
+
 import staging
 from pipeline import runner
 from pipeline import registry
+from pipeline import shard
+from pipeline import watch
 from utils import environ
 
 
-def stage_files():
+def stage_files(
+    workers: int = 1,
+    verify: bool = False,
+    options: runner.StageOptions = runner.DEFAULT_OPTIONS,
+):
+    env = environ.create_env()
+    registry.load_staging_pipelines(staging)
+    outcomes = runner.stage_files(
+        env.raw_data, env.staged_data, workers=workers, verify=verify, options=options
+    )
+
+
+def watch_files(
+    interval: float,
+    settle: float,
+    verify: bool = False,
+    options: runner.StageOptions = runner.DEFAULT_OPTIONS,
+):
     env = environ.create_env()
     registry.load_staging_pipelines(staging)
-    outcomes = runner.stage_files(env.raw_data, env.staged_data)
+    watcher = watch.Watcher(
+        env.raw_data, env.staged_data, interval, settle, verify, options
+    )
+    watcher.run()
+
+
+def profile_run_dir(profile_dir: str | None) -> Path | None:
+    """Give each run its own directory, so profiles can be compared across runs."""
+    if profile_dir is None:
+        return None
+    run_time = datetime.now(UTC).strftime("%Y%m%dT%H%M%SZ")
+    return Path(profile_dir) / run_time
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Stage raw files.")
+    parser.add_argument(
+        "-w",
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of worker processes used to stage files (default: 1).",
+    )
+    parser.add_argument(
+        "--verify",
+        action="store_true",
+        help="Ignore cached fingerprints and re-hash every raw file.",
+    )
+    parser.add_argument(
+        "--format",
+        dest="output_format",
+        choices=["parquet", "ipc"],
+        default="parquet",
+        help="Staged output format (default: parquet).",
+    )
+    parser.add_argument(
+        "--validation",
+        choices=["native", "pandera"],
+        default="native",
+        help="Schema validation backend (default: native).",
+    )
+    parser.add_argument(
+        "--lazy-validation",
+        action="store_true",
+        help=(
+            "Report every schema failure instead of stopping at the first "
+            "(native validation only)."
+        ),
+    )
+    parser.add_argument(
+        "--streaming",
+        action="store_true",
+        help="Validate and write each sheet as its own part to bound memory.",
+    )
+    parser.add_argument(
+        "--streaming-engine",
+        action="store_true",
+        help="Collect each workbook's staging plan on polars' streaming engine.",
+    )
+    parser.add_argument(
+        "--sheet-cache",
+        dest="sheet_cache_dir",
+        help="Cache parsed workbook sheets here, so re-staging skips Excel parsing.",
+    )
+    parser.add_argument(
+        "--sheet-cache-mb",
+        type=int,
+        default=1024,
+        help="Evict least recently used cached sheets beyond this size (default: 1024).",
+    )
+    parser.add_argument(
+        "--no-preflight",
+        dest="preflight",
+        action="store_false",
+        help="Skip the sheet and header checks made before parsing each file.",
+    )
+    parser.add_argument(
+        "--profile",
+        dest="profile_dir",
+        nargs="?",
+        const="profiles",
+        help=(
+            "Write a cProfile, polars plans and validation timings for each file "
+            "staged to DIR/<run time>/<file hash>/ (default DIR: profiles)."
+        ),
+        metavar="DIR",
+    )
+    parser.add_argument(
+        "--shard",
+        type=shard.Shard.parse,
+        help="Stage only shard I/N of the raw files, e.g. 0/4, split by file hash.",
+        metavar="I/N",
+    )
+    parser.add_argument(
+        "--claim",
+        action="store_true",
+        help="Claim each file in the staged directory so concurrent workers skip it.",
+    )
+    parser.add_argument(
+        "--claim-timeout",
+        type=float,
+        default=shard.DEFAULT_STALE_SECONDS,
+        help="Break claims not renewed for this many seconds (default: 3600).",
+    )
+    parser.add_argument(
+        "--run-id",
+        help="Write this worker's report for run RUN_ID, for merge_run_reports.py.",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="Keep running and stage new or changed raw files as they land.",
+    )
+    parser.add_argument(
+        "--interval",
+        type=float,
+        default=2.0,
+        help="Seconds between scans in watch mode (default: 2).",
+    )
+    parser.add_argument(
+        "--settle",
+        type=float,
+        default=5.0,
+        help="Seconds a file must stay unchanged before it is staged (default: 5).",
+    )
+    parser.add_argument(
+        "--metrics-dir",
+        help="Write per-file metrics as JSON lines and a Prometheus textfile here.",
+    )
+    args = parser.parse_args()
+    if args.lazy_validation and args.validation != "native":
+        parser.error("--lazy-validation needs --validation native.")
+    return args
 
 
 if __name__ == "__main__":
-    stage_files()
+    args = parse_args()
+    options = runner.StageOptions(
+        output_format=args.output_format,
+        validation=args.validation,
+        lazy_validation=args.lazy_validation,
+        metrics_dir=args.metrics_dir,
+        streaming=args.streaming,
+        streaming_engine=args.streaming_engine,
+        sheet_cache_dir=args.sheet_cache_dir,
+        sheet_cache_mb=args.sheet_cache_mb,
+        preflight=args.preflight,
+        profile_dir=profile_run_dir(args.profile_dir),
+        shard=args.shard,
+        claim=args.claim,
+        claim_stale_seconds=args.claim_timeout,
+        run_id=args.run_id,
+    )
+    if args.watch:
+        watch_files(args.interval, args.settle, verify=args.verify, options=options)
+    else:
+        stage_files(workers=args.workers, verify=args.verify, options=options)
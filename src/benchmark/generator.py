@@ -0,0 +1,173 @@
+"""benchmark/generator.py"""
+
+import importlib
+import pkgutil
+import random
+from pathlib import Path
+from types import ModuleType
+from typing import NamedTuple
+
+import staging
+from staging import engine
+from . import xlsx
+
+
+HIERARCHY_MODULE = "local_authority_hierarchy"
+HIERARCHY_HEADER = ["LAD", "LAD name", "RGN", "RGN name", "CTRY", "CTRY name"]
+FIRST_YEAR = 2000
+TITLE_ROWS = ["Synthetic benchmark workbook", "Source: generated"]
+# Rows above the LAs whose codes the engine filters out.
+AGGREGATE_AREAS = [("K02000001", "United Kingdom"), ("K04000001", "England and Wales")]
+SUPPRESSED = "x"
+
+
+class GeneratorOptions(NamedTuple):
+    n_local_authorities: int = 360
+    n_years: int = 15
+    # Sheets per workbook; None keeps each module's own sheet count.
+    n_sheets: int | None = None
+    suppressed_fraction: float = 0.02
+    seed: int = 0
+
+
+DEFAULT_OPTIONS = GeneratorOptions()
+
+
+class SyntheticFile(NamedTuple):
+    module: str
+    path: Path
+    # The module's spec, rescaled to the generated sheets and row count; None
+    # for files not staged by the engine.
+    spec: engine.WorkbookSpec | None
+
+
+def generate(
+    out_dir: Path | str, options: GeneratorOptions = DEFAULT_OPTIONS
+) -> list[SyntheticFile]:
+    """
+    Write one synthetic raw file per staging module to `out_dir`.
+
+    Engine-staged modules get an xlsx workbook laid out as their
+    `WorkbookSpec` expects (title rows above `header_row`, the LA code column,
+    4-digit year columns or `Period`/`Value` columns, aggregate areas above the
+    LAs and suppressed cells); the LA hierarchy gets a CSV.
+    """
+    out_dir_path = Path(out_dir)
+    out_dir_path.mkdir(parents=True, exist_ok=True)
+    rnd = random.Random(options.seed)
+    codes = local_authority_codes(options.n_local_authorities)
+    years = [str(FIRST_YEAR + i) for i in range(options.n_years)]
+
+    files = []
+    for name, module in staging_modules().items():
+        if name == HIERARCHY_MODULE:
+            path = write_hierarchy(out_dir_path / f"{name}.csv", codes)
+            files.append(SyntheticFile(name, path, None))
+            continue
+
+        spec = scale_spec(module.spec, options)
+        sheets = {
+            sheet_name: sheet_rows(spec, codes, years, rnd, options)
+            for sheet_name in spec.sheet_metric
+        }
+        path = xlsx.write_workbook(out_dir_path / f"{name}.xlsx", sheets)
+        files.append(SyntheticFile(name, path, spec))
+
+    return files
+
+
+def staging_modules() -> dict[str, ModuleType]:
+    """Return the engine-staged modules (those with a `spec`) and the hierarchy."""
+    modules = {}
+    for _, module_name, _ in pkgutil.iter_modules(staging.__path__):
+        module = importlib.import_module(f"{staging.__name__}.{module_name}")
+        if module_name == HIERARCHY_MODULE or isinstance(
+            getattr(module, "spec", None), engine.WorkbookSpec
+        ):
+            modules[module_name] = module
+
+    return modules
+
+
+def scale_spec(
+    spec: engine.WorkbookSpec, options: GeneratorOptions
+) -> engine.WorkbookSpec:
+    """Resize `spec` to `n_sheets` sheets and lift its fixed `n_rows` limit."""
+    sheet_metric = spec.sheet_metric
+    if options.n_sheets is not None:
+        templates = list(sheet_metric.values())
+        sheet_metric = {}
+        for i in range(options.n_sheets):
+            template = templates[i % len(templates)]
+            suffix = "" if i < len(templates) else f" {i}"
+            sheet_metric[f"Sheet {i + 1}"] = {
+                k: f"{v}{suffix}" for k, v in template.items()
+            }
+
+    read_options = {k: v for k, v in spec.read_options.items() if k != "n_rows"}
+    return spec._replace(sheet_metric=sheet_metric, read_options=read_options)
+
+
+def sheet_rows(
+    spec: engine.WorkbookSpec,
+    codes: list[str],
+    years: list[str],
+    rnd: random.Random,
+    options: GeneratorOptions,
+) -> xlsx.Rows:
+    header_row = spec.read_options.get("header_row", 0)
+    rows: xlsx.Rows = [[title] for title in TITLE_ROWS[:header_row]]
+    rows += [[] for _ in range(header_row - len(rows))]
+
+    def value() -> float | str:
+        # Only specs that drop nulls tolerate suppressed cells.
+        if spec.drop_nulls and rnd.random() < options.suppressed_fraction:
+            return SUPPRESSED
+        return round(rnd.uniform(0, 1000), 3)
+
+    areas = AGGREGATE_AREAS + [(code, f"Local authority {code}") for code in codes]
+    if spec.layout == "long":
+        rows.append(
+            [
+                spec.local_authority_col,
+                "Area name",
+                spec.period_col,
+                f"{spec.value_col} (units)",
+            ]
+        )
+        for code, name in areas:
+            for year in years:
+                period = f"{year} (Apr {year[2:]}-Mar {int(year[2:]) + 1:02d})"
+                rows.append([code, name, period, round(rnd.uniform(0, 100), 3)])
+    elif spec.local_authority_col.startswith("__UNNAMED__"):
+        # The code column has no header; the name sits in the first column.
+        rows.append(["Description", None, *years])
+        for code, name in areas:
+            rows.append([name, code, *(value() for _ in years)])
+    else:
+        rows.append([spec.local_authority_col, "Local authority name", *years])
+        for code, name in areas:
+            rows.append([code, name, *(value() for _ in years)])
+
+    return rows
+
+
+def write_hierarchy(path: Path, codes: list[str]) -> Path:
+    lines = [",".join(HIERARCHY_HEADER)]
+    for i, code in enumerate(codes):
+        country_code, country_name = (
+            ("E92000001", "England") if code[0] == "E" else ("W92000001", "Wales")
+        )
+        region = i % 9 + 1
+        lines.append(
+            f"{code},Local authority {code},E1200000{region},Region {region},"
+            f"{country_code},{country_name}"
+        )
+    path.write_text("\n".join(lines) + "\n")
+
+    return path
+
+
+def local_authority_codes(n: int) -> list[str]:
+    """Return `n` distinct GSS-style LA codes, roughly one Welsh in ten."""
+    return [f"W06{i:06d}" if i % 10 == 9 else f"E06{i:06d}" for i in range(n)]
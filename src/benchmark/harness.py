@@ -0,0 +1,228 @@
+"""benchmark/harness.py"""
+
+import json
+import platform
+import resource
+import statistics
+import sys
+import tempfile
+import time
+from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor
+from datetime import UTC, datetime
+from multiprocessing import get_context
+from pathlib import Path
+from typing import Any, NamedTuple
+
+import polars as pl
+
+from pipeline import validation, writer
+from pipeline.validation import ValidationBackend
+from staging import engine
+from utils import file_handler as fh
+from utils import workbook
+from . import generator
+
+
+# ru_maxrss is reported in KiB on Linux and in bytes on macOS.
+RSS_UNIT = 1 if sys.platform == "darwin" else 1024
+# Slowdowns smaller than this are timer noise, whatever the tolerance.
+MIN_REGRESSION_SECONDS = 0.005
+
+
+class BenchmarkOptions(NamedTuple):
+    repeats: int = 3
+    validation: ValidationBackend = "native"
+    output_format: writer.StagedFormat = "parquet"
+
+
+DEFAULT_OPTIONS = BenchmarkOptions()
+
+
+class PhaseResult(NamedTuple):
+    module: str
+    phase: str
+    rows: int
+    seconds_min: float
+    seconds_median: float
+    # Process high-water mark after the phase, and how far the phase raised it.
+    peak_rss_mb: float
+    rss_growth_mb: float
+
+
+def run_benchmarks(
+    data_dir: Path | str,
+    generator_options: generator.GeneratorOptions = generator.DEFAULT_OPTIONS,
+    options: BenchmarkOptions = DEFAULT_OPTIONS,
+) -> dict[str, Any]:
+    """
+    Generate synthetic raw files in `data_dir` and time each staging phase.
+
+    Every file is benchmarked in a fresh process so peak memory is not
+    inherited from earlier files. Besides the separate phases, the fused
+    `engine.stage` plan is timed as phase "stage" in its own process, since
+    polars optimises the phases together there.
+    """
+    files = generator.generate(data_dir, generator_options)
+    context = get_context("spawn")
+    results: list[PhaseResult] = []
+    for synthetic in files:
+        for fused in (False, True):
+            if fused and synthetic.spec is None:
+                continue
+            with ProcessPoolExecutor(1, mp_context=context) as executor:
+                results += executor.submit(
+                    benchmark_file, synthetic, options, fused
+                ).result()
+
+    return {
+        "created_at": datetime.now(UTC).isoformat(timespec="seconds"),
+        "environment": {
+            "python": platform.python_version(),
+            "polars": pl.__version__,
+            "platform": platform.platform(),
+            "machine": platform.machine(),
+        },
+        "generator": generator_options._asdict(),
+        "options": options._asdict(),
+        "results": [result._asdict() for result in results],
+    }
+
+
+def benchmark_file(
+    synthetic: generator.SyntheticFile, options: BenchmarkOptions, fused: bool
+) -> list[PhaseResult]:
+    """Time the staging phases for one synthetic file (run in a child process)."""
+    results = []
+
+    def measure(phase: str, func: Callable[[], Any], rows: int = 0) -> Any:
+        rss_before = peak_rss_mb()
+        durations = []
+        for _ in range(options.repeats):
+            start = time.perf_counter()
+            result = func()
+            durations.append(time.perf_counter() - start)
+        rss_after = peak_rss_mb()
+        frames = result.values() if isinstance(result, dict) else [result]
+        rows = rows or sum(f.height for f in frames if isinstance(f, pl.DataFrame))
+        results.append(
+            PhaseResult(
+                synthetic.module,
+                phase,
+                rows,
+                min(durations),
+                statistics.median(durations),
+                rss_after,
+                rss_after - rss_before,
+            )
+        )
+        return result
+
+    spec = synthetic.spec
+    module = generator.staging_modules()[synthetic.module]
+    if fused:
+        measure("stage", lambda: engine.stage(synthetic.path, spec))
+        return results
+
+    measure("hash_file", lambda: fh.hash_file(synthetic.path))
+    if spec is None:
+        staged = measure("load", lambda: module.stage(synthetic.path))
+    else:
+        measure("preflight", lambda: engine.check_structure(synthetic.path, spec))
+        sheets = measure("load", lambda: read_sheets(synthetic.path, spec))
+        cleaned = measure("clean", lambda: clean(sheets, spec))
+        staged = measure("transform", lambda: transform(cleaned, spec, synthetic))
+
+    validated = measure(
+        "validate",
+        lambda: validation.validate(staged, module.schema, options.validation),
+    )
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = Path(tmp_dir) / writer.staged_file_name(
+            "benchmark", options.output_format
+        )
+        measure(
+            "write",
+            lambda: writer.write_staged(validated, path, options.output_format),
+            rows=validated.height,
+        )
+
+    return results
+
+
+def read_sheets(source: Path, spec: engine.WorkbookSpec) -> dict[str, pl.DataFrame]:
+    read_options = {**spec.read_options, "use_columns": engine.used_columns(spec)}
+    sheets = dict.fromkeys(spec.sheet_metric, read_options)
+    return dict(zip(sheets, workbook.map_sheets(source, sheets, lambda _, df: df)))
+
+
+def clean(
+    sheets: dict[str, pl.DataFrame], spec: engine.WorkbookSpec
+) -> dict[str, pl.DataFrame]:
+    return {
+        sheet_name: engine.clean(data.lazy(), spec).collect()
+        for sheet_name, data in sheets.items()
+    }
+
+
+def transform(
+    cleaned: dict[str, pl.DataFrame],
+    spec: engine.WorkbookSpec,
+    synthetic: generator.SyntheticFile,
+) -> pl.DataFrame:
+    return pl.concat(
+        engine.annotate(
+            engine.transform(data.lazy(), spec),
+            metric_group=spec.metric_group,
+            **spec.sheet_metric[sheet_name],
+            source=synthetic.path.name,
+        )
+        for sheet_name, data in cleaned.items()
+    ).collect()
+
+
+def peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * RSS_UNIT / 2**20
+
+
+def write_results(report: dict[str, Any], path: Path | str) -> Path:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(report, indent=2) + "\n")
+    return path
+
+
+def compare(
+    baseline: dict[str, Any], report: dict[str, Any], tolerance: float = 0.2
+) -> list[str]:
+    """
+    Return a message for every (module, phase) slower than `baseline`.
+
+    A phase regresses when its fastest run exceeds the baseline's fastest run
+    by more than `tolerance` (a fraction) and by more than
+    `MIN_REGRESSION_SECONDS`. Runs with different generator settings are not
+    comparable and raise `ValueError`.
+    """
+    if baseline["generator"] != report["generator"]:
+        raise ValueError(
+            f"Baseline was generated with {baseline['generator']}, "
+            f"not {report['generator']}."
+        )
+
+    baseline_seconds = {
+        (result["module"], result["phase"]): result["seconds_min"]
+        for result in baseline["results"]
+    }
+    regressions = []
+    for result in report["results"]:
+        key = (result["module"], result["phase"])
+        if key not in baseline_seconds:
+            continue
+        before, after = baseline_seconds[key], result["seconds_min"]
+        if after > before * (1 + tolerance) and after - before > MIN_REGRESSION_SECONDS:
+            regressions.append(
+                f"{key[0]}.{key[1]}: {before * 1000:.1f}ms -> {after * 1000:.1f}ms "
+                f"(+{(after / before - 1) * 100:.0f}%)"
+            )
+
+    return regressions
@@ -0,0 +1,111 @@
+"""benchmark/xlsx.py"""
+
+import zipfile
+from pathlib import Path
+from xml.sax.saxutils import escape, quoteattr
+
+
+Cell = str | float | int | None
+Rows = list[list[Cell]]
+
+CONTENT_TYPES = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">
+<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>
+<Default Extension="xml" ContentType="application/xml"/>
+<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>
+{overrides}
+</Types>"""
+SHEET_OVERRIDE = (
+    '<Override PartName="/xl/worksheets/sheet{i}.xml" ContentType='
+    '"application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+)
+ROOT_RELS = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>
+</Relationships>"""
+WORKBOOK = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">
+<sheets>{sheets}</sheets>
+</workbook>"""
+WORKBOOK_RELS = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+{rels}
+</Relationships>"""
+SHEET_REL = (
+    '<Relationship Id="rId{i}" Type="http://schemas.openxmlformats.org/'
+    'officeDocument/2006/relationships/worksheet" Target="worksheets/sheet{i}.xml"/>'
+)
+WORKSHEET_OPEN = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    "<sheetData>"
+)
+WORKSHEET_CLOSE = "</sheetData></worksheet>"
+
+
+def write_workbook(path: Path | str, sheets: dict[str, Rows]) -> Path:
+    """
+    Write `sheets` (sheet name -> rows of cells) to a minimal xlsx workbook.
+
+    Strings are stored inline and numbers as numeric cells; `None` leaves the
+    cell empty. Enough of SpreadsheetML for fastexcel to read, without adding
+    an Excel writer dependency.
+    """
+    path = Path(path)
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zf:
+        indices = range(1, len(sheets) + 1)
+        zf.writestr(
+            "[Content_Types].xml",
+            CONTENT_TYPES.format(
+                overrides="".join(SHEET_OVERRIDE.format(i=i) for i in indices)
+            ),
+        )
+        zf.writestr("_rels/.rels", ROOT_RELS)
+        zf.writestr(
+            "xl/workbook.xml",
+            WORKBOOK.format(
+                sheets="".join(
+                    f'<sheet name={quoteattr(name)} sheetId="{i}" r:id="rId{i}"/>'
+                    for i, name in zip(indices, sheets)
+                )
+            ),
+        )
+        zf.writestr(
+            "xl/_rels/workbook.xml.rels",
+            WORKBOOK_RELS.format(rels="".join(SHEET_REL.format(i=i) for i in indices)),
+        )
+        for i, rows in zip(indices, sheets.values()):
+            with zf.open(f"xl/worksheets/sheet{i}.xml", "w") as f:
+                f.write(WORKSHEET_OPEN.encode())
+                for r, row in enumerate(rows, start=1):
+                    f.write(worksheet_row(r, row).encode())
+                f.write(WORKSHEET_CLOSE.encode())
+
+    return path
+
+
+def worksheet_row(r: int, row: list[Cell]) -> str:
+    cells = []
+    for c, value in enumerate(row):
+        if value is None:
+            continue
+        ref = f"{column_letter(c)}{r}"
+        if isinstance(value, str):
+            cells.append(
+                f'<c r="{ref}" t="inlineStr"><is><t>{escape(value)}</t></is></c>'
+            )
+        else:
+            cells.append(f'<c r="{ref}"><v>{value!r}</v></c>')
+
+    return f'<row r="{r}">{"".join(cells)}</row>'
+
+
+def column_letter(index: int) -> str:
+    """Return the Excel column letters for the 0-based column `index`."""
+    letters = ""
+    index += 1
+    while index:
+        index, rem = divmod(index - 1, 26)
+        letters = chr(ord("A") + rem) + letters
+
+    return letters
@@ -30,6 +30,26 @@ def log_starting_staging():
     logger.info("Initializing staging.")
 
 
+def log_staging_workers(workers: int) -> None:
+    logger.info(f"Staging with {workers} worker processes.")
+
+
+def log_starting_warehouse_load(database) -> None:
+    logger.info(f"Loading staged files into '{database}'.")
+
+
+def log_watching(raw_dir, interval: float) -> None:
+    logger.info(f"Watching '{raw_dir}' every {interval:g}s; Ctrl-C to stop.")
+
+
+def log_watch_stopped() -> None:
+    logger.info("Stopped watching.")
+
+
+def log_pipeline_import_failed(module_name: str, err: Exception) -> None:
+    logger.error(f"Could not import staging module '{module_name}': {err!r}")
+
+
 def log_no_staging_pipelines_registered():
     logger.warning("No staging pipelines registered — exiting early.")
 
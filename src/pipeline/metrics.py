@@ -0,0 +1,168 @@
+"""pipeline.metrics.py"""
+
+import json
+import os
+import re
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from typing import NamedTuple
+
+from .outcome import Outcome
+
+
+JSON_LINES_NAME = "staging_metrics.jsonl"
+PROMETHEUS_NAME = "staging.prom"
+# Writing "5" to clear_refs resets the VmHWM reported in status (Linux only).
+CLEAR_REFS = Path("/proc/self/clear_refs")
+PROC_STATUS = Path("/proc/self/status")
+VM_HWM = re.compile(r"^VmHWM:\s+(\d+) kB$", re.MULTILINE)
+
+
+class FileMetrics(NamedTuple):
+    file_name: str
+    file_hash: str
+    # Module of the registered staging pipeline, e.g. "staging.regional_gdhi".
+    dataset: str
+    outcome: Outcome
+    phase_seconds: dict[str, float]
+    rows_in: int
+    rows_out: int
+    bytes_in: int
+    bytes_out: int
+    # Peak RSS of the staging process while it staged this file; None where
+    # the high-water mark cannot be reset between files.
+    peak_rss_bytes: int | None
+    finished_at: float
+
+
+class Recorder:
+    """Collects the phase timings and sizes of one `runner.stage` call."""
+
+    def __init__(self, file_path: Path):
+        self.file_path = file_path
+        self.file_hash = ""
+        self.dataset = ""
+        self.phase_seconds: dict[str, float] = {}
+        self.rows_in = 0
+        self.rows_out = 0
+        self.bytes_out = 0
+        self.tracks_peak_rss = reset_peak_rss()
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        # Failed phases are timed too, up to the point they raised. A phase
+        # entered more than once (e.g. per streamed part) accumulates.
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.phase_seconds[name] = self.phase_seconds.get(name, 0.0) + elapsed
+
+    def finish(self, outcome: Outcome) -> FileMetrics:
+        return FileMetrics(
+            file_name=self.file_path.name,
+            file_hash=self.file_hash,
+            dataset=self.dataset,
+            outcome=outcome,
+            phase_seconds=self.phase_seconds,
+            rows_in=self.rows_in,
+            rows_out=self.rows_out,
+            bytes_in=file_size(self.file_path),
+            bytes_out=self.bytes_out,
+            peak_rss_bytes=peak_rss_bytes() if self.tracks_peak_rss else None,
+            finished_at=time.time(),
+        )
+
+
+def write_metrics(metrics: list[FileMetrics], metrics_dir: Path | str) -> None:
+    """
+    Append `metrics` to the JSON lines log and rewrite the Prometheus file.
+
+    The `.prom` file is written atomically, as the node exporter's textfile
+    collector requires, and only describes the latest run.
+    """
+    metrics_dir_path = Path(metrics_dir)
+    metrics_dir_path.mkdir(parents=True, exist_ok=True)
+
+    with (metrics_dir_path / JSON_LINES_NAME).open("a") as f:
+        for file_metrics in metrics:
+            f.write(json.dumps(file_metrics._asdict()) + "\n")
+
+    prom_path = metrics_dir_path / PROMETHEUS_NAME
+    tmp_path = prom_path.with_name(f".{prom_path.name}.{os.getpid()}.tmp")
+    tmp_path.write_text(format_prometheus(metrics))
+    os.replace(tmp_path, prom_path)
+
+
+def format_prometheus(metrics: list[FileMetrics]) -> str:
+    """Render `metrics` in the Prometheus text exposition format."""
+    samples: dict[str, list[str]] = {
+        "staging_phase_seconds": [],
+        "staging_rows_in": [],
+        "staging_rows_out": [],
+        "staging_bytes_in": [],
+        "staging_bytes_out": [],
+        "staging_peak_rss_bytes": [],
+        "staging_outcome": [],
+        "staging_finished_timestamp_seconds": [],
+    }
+    for m in metrics:
+        labels = (
+            f'file="{escape_label(m.file_name)}",'
+            f'file_hash="{m.file_hash}",'
+            f'dataset="{escape_label(m.dataset)}"'
+        )
+        for phase, seconds in m.phase_seconds.items():
+            samples["staging_phase_seconds"].append(
+                f'{{{labels},phase="{phase}"}} {seconds:.6f}'
+            )
+        samples["staging_rows_in"].append(f"{{{labels}}} {m.rows_in}")
+        samples["staging_rows_out"].append(f"{{{labels}}} {m.rows_out}")
+        samples["staging_bytes_in"].append(f"{{{labels}}} {m.bytes_in}")
+        samples["staging_bytes_out"].append(f"{{{labels}}} {m.bytes_out}")
+        if m.peak_rss_bytes is not None:
+            samples["staging_peak_rss_bytes"].append(f"{{{labels}}} {m.peak_rss_bytes}")
+        samples["staging_outcome"].append(f'{{{labels},outcome="{m.outcome.value}"}} 1')
+        samples["staging_finished_timestamp_seconds"].append(
+            f"{{{labels}}} {m.finished_at:.3f}"
+        )
+
+    lines = []
+    for name, values in samples.items():
+        lines.append(f"# TYPE {name} gauge")
+        lines.extend(f"{name}{value}" for value in values)
+
+    return "\n".join(lines) + "\n"
+
+
+def escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def file_size(path: Path) -> int:
+    try:
+        return path.stat().st_size if path.is_file() else 0
+    except OSError:
+        return 0
+
+
+def reset_peak_rss() -> bool:
+    """
+    Reset this process's RSS high-water mark, so it covers only what follows.
+
+    `ru_maxrss` never falls, so after the largest file it would report the
+    same peak for every file. Returns False where the mark cannot be reset.
+    """
+    try:
+        CLEAR_REFS.write_text("5")
+    except OSError:
+        return False
+    return True
+
+
+def peak_rss_bytes() -> int:
+    """Return this process's RSS high-water mark since it was last reset."""
+    return int(VM_HWM.search(PROC_STATUS.read_text()).group(1)) * 1024
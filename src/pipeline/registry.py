@@ -1,49 +1,163 @@
 """pipeline.registry.py"""
 
+from __future__ import annotations
+
+import ast
 import importlib
 import pkgutil
+from collections.abc import Iterator
 from pathlib import Path
-from typing import Callable, NamedTuple
+from types import ModuleType
+from typing import TYPE_CHECKING, Callable, NamedTuple
 
-import polars as pl
-from pandera import polars as pa
 from loguru import logger
 
+from utils import file_handler as fh
+
+if TYPE_CHECKING:
+    import polars as pl
+    from pandera import polars as pa
+
+
+PipelineFn = Callable[[Path | str], "pl.DataFrame"]
+# Stages a file as a sequence of parts (e.g. one per sheet) for streaming.
+PartsFn = Callable[[Path | str], Iterator["pl.DataFrame"]]
+# Checks a file's structure before it is parsed, returning any problems.
+PreflightFn = Callable[[Path | str], list[str]]
 
-PipelineFn = Callable[[Path | str], pl.DataFrame]
+MANIFEST_NAME = "manifest.toml"
+MANIFEST_HEADER = (
+    "# Generated by scripts/build_manifest.py: staged file hash -> module.\n"
+)
 
 
 class StagingPipeline(NamedTuple):
     pipeline_fn: PipelineFn
     stage_schema: pa.DataFrameSchema
+    parts_fn: PartsFn | None = None
+    preflight_fn: PreflightFn | None = None
+
+
+class PipelineRegistry(dict[str, StagingPipeline]):
+    """
+    Staging pipelines by file hash, imported on first lookup.
+
+    `manifest` maps each file hash to the module that registers its pipeline;
+    looking up a hash that has not been registered yet imports that module,
+    whose `register_staging_pipeline` decorator fills the entry. Unknown
+    hashes raise `KeyError` as before.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.manifest: dict[str, str] = {}
+
+    def __missing__(self, file_hash: str) -> StagingPipeline:
+        module_name = self.manifest[file_hash]
+        importlib.import_module(module_name)
+        logger.debug(f"Imported staging pipeline module: {module_name}")
+        # A stale manifest may name a module that no longer registers it.
+        if not dict.__contains__(self, file_hash):
+            raise KeyError(file_hash)
+        return dict.__getitem__(self, file_hash)
+
+    def __contains__(self, file_hash: object) -> bool:
+        return dict.__contains__(self, file_hash) or file_hash in self.manifest
+
+    def __len__(self) -> int:
+        return len(self.manifest.keys() | self.keys())
 
 
-staging_pipelines: dict[str, StagingPipeline] = {}
+staging_pipelines = PipelineRegistry()
+staging_packages: set[str] = set()
 
 
-def register_staging_pipeline(file_hash: str, schema: pa.DataFrameSchema):
+def register_staging_pipeline(
+    file_hash: str,
+    schema: pa.DataFrameSchema,
+    parts_fn: PartsFn | None = None,
+    preflight_fn: PreflightFn | None = None,
+):
     def decorator(func):
-        staging_pipelines[file_hash] = StagingPipeline(func, schema)
+        staging_pipelines[file_hash] = StagingPipeline(
+            func, schema, parts_fn, preflight_fn
+        )
         return func
 
     return decorator
 
 
-def load_staging_pipelines(staging):
+def load_staging_pipelines(staging: ModuleType) -> int:
     """
-    Dynamically import modules inside data_pipeline.staging so that their
-    register_staging_pipeline decorators populate staging_pipelines.
+    Register the pipelines of the modules inside `staging` from its manifest.
+
+    No staging module is imported here; each is imported the first time a
+    file with one of its hashes is staged. If the manifest is missing or older
+    than a module, it is rebuilt in memory from the modules' source. Returns
+    the number of hashes registered.
     """
-    succ, err = 0, 0
-    for _, module_name, _ in pkgutil.iter_modules(staging.__path__):
-        try:
-            importlib.import_module(f"{staging.__name__}.{module_name}")
-            succ += 1
-            logger.debug(f"Imported staging pipeline module: {module_name}")
-        except Exception as e:
-            err += 1
-            logger.error(
-                f"Failed to import staging pipeline module '{module_name}': {e}"
+    staging_packages.add(staging.__name__)
+    package_dir = Path(staging.__path__[0])
+    manifest_path = package_dir / MANIFEST_NAME
+    manifest = (
+        fh.load_toml(manifest_path)["pipelines"] if manifest_path.exists() else {}
+    )
+    if is_stale(manifest_path, package_dir):
+        # A module may have changed since the manifest was written.
+        built = build_manifest(staging)
+        if built != manifest:
+            logger.warning(
+                f"Manifest '{manifest_path}' is missing or out of date; "
+                "run scripts/build_manifest.py."
             )
+        manifest = built
+
+    for file_hash, module_name in manifest.items():
+        staging_pipelines.manifest[file_hash] = f"{staging.__name__}.{module_name}"
+
+    return len(manifest)
+
+
+def build_manifest(staging: ModuleType) -> dict[str, str]:
+    """
+    Map every file hash in `staging` to its module without importing it.
+
+    Each module declares its hash as a module-level `hash = "..."` literal,
+    which is read from the module's source.
+    """
+    manifest = {}
+    for module_info in pkgutil.iter_modules(staging.__path__):
+        module_path = Path(module_info.module_finder.path) / f"{module_info.name}.py"
+        if not module_path.is_file():
+            continue
+        for node in ast.parse(module_path.read_text()).body:
+            if (
+                isinstance(node, ast.Assign)
+                and [getattr(target, "id", None) for target in node.targets] == ["hash"]
+                and isinstance(node.value, ast.Constant)
+            ):
+                manifest[node.value.value] = module_info.name
+
+    return manifest
+
+
+def write_manifest(staging: ModuleType) -> Path:
+    manifest_path = Path(staging.__path__[0]) / MANIFEST_NAME
+    lines = [MANIFEST_HEADER, "[pipelines]"]
+    for file_hash, module_name in sorted(
+        build_manifest(staging).items(), key=lambda item: item[1]
+    ):
+        lines.append(f'"{file_hash}" = "{module_name}"')
+    manifest_path.write_text("\n".join(lines) + "\n")
+
+    return manifest_path
+
 
-    return succ, err
+def is_stale(manifest_path: Path, package_dir: Path) -> bool:
+    if not manifest_path.exists():
+        return True
+    manifest_mtime = manifest_path.stat().st_mtime_ns
+    return any(
+        module_path.stat().st_mtime_ns > manifest_mtime
+        for module_path in package_dir.glob("*.py")
+    )
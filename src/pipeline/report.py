@@ -0,0 +1,91 @@
+"""pipeline.report.py"""
+
+import json
+import os
+from collections import Counter
+from pathlib import Path
+
+from .metrics import FileMetrics
+from .outcome import Outcome
+
+
+REPORTS_DIR = ".runs"
+# When workers report the same file, the most final outcome is kept: a file
+# one worker staged is staged, whoever skipped it.
+PRECEDENCE = {Outcome.SUCCESS: 2, Outcome.FAILED: 1, Outcome.SKIPPED: 0}
+
+
+def worker_report_path(stage_dir_path: Path, run_id: str, worker: str) -> Path:
+    return stage_dir_path / REPORTS_DIR / run_id / f"{worker}.json"
+
+
+def run_report_path(stage_dir_path: Path, run_id: str) -> Path:
+    return stage_dir_path / REPORTS_DIR / f"{run_id}.json"
+
+
+def write_report(
+    results: list[tuple[str, FileMetrics]],
+    stage_dir_path: Path,
+    run_id: str,
+    worker: str,
+    shard: str | None = None,
+) -> Path:
+    """Write one worker's `(message, metrics)` results for run `run_id`."""
+    path = worker_report_path(stage_dir_path, run_id, worker)
+    files = [
+        {**file_metrics._asdict(), "message": message}
+        for message, file_metrics in results
+    ]
+    write_json({"worker": worker, "shard": shard, "files": files}, path)
+    return path
+
+
+def merge_reports(stage_dir_path: Path | str, run_id: str) -> dict:
+    """
+    Merge the worker reports of run `run_id` into a single run report.
+
+    Each file appears once, with the outcome, message and metrics of the
+    worker that settled it, and the worker and shard that did. The report is
+    written next to the run's worker reports and returned.
+    """
+    stage_dir_path = Path(stage_dir_path)
+    worker_paths = sorted((stage_dir_path / REPORTS_DIR / run_id).glob("*.json"))
+    if not worker_paths:
+        raise FileNotFoundError(f"No worker reports for run '{run_id}'.")
+
+    merged: dict[str, dict] = {}
+    workers = []
+    for path in worker_paths:
+        with path.open() as f:
+            worker_report = json.load(f)
+        workers.append(worker_report["worker"])
+        for entry in worker_report["files"]:
+            entry = {
+                **entry,
+                "worker": worker_report["worker"],
+                "shard": worker_report["shard"],
+            }
+            key = entry["file_hash"] or entry["file_name"]
+            if key not in merged or rank(entry) > rank(merged[key]):
+                merged[key] = entry
+
+    files = sorted(merged.values(), key=lambda entry: entry["file_name"])
+    report = {
+        "run_id": run_id,
+        "workers": workers,
+        "outcomes": dict(Counter(entry["outcome"] for entry in files)),
+        "files": files,
+    }
+    write_json(report, run_report_path(stage_dir_path, run_id))
+    return report
+
+
+def rank(entry: dict) -> tuple[int, float]:
+    return PRECEDENCE[Outcome(entry["outcome"])], entry["finished_at"]
+
+
+def write_json(data: dict, path: Path) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp_path.write_text(json.dumps(data, indent=2))
+    os.replace(tmp_path, path)
@@ -1,47 +1,280 @@
 """pipeline.runner.py"""
 
-from pathlib import Path
+from __future__ import annotations
 
-import polars as pl
-from pandera import errors as pae
+import importlib
+import multiprocessing
+from collections.abc import Iterable, Iterator
+from contextlib import AbstractContextManager, contextmanager, nullcontext
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from pathlib import Path
+from typing import TYPE_CHECKING, NamedTuple
 
 from . import registry
 from . import log
+from . import metrics
+from . import shard
+from . import writer
+from .metrics import FileMetrics
 from .outcome import Outcome
+from .shard import DEFAULT_STALE_SECONDS, Shard
 from utils import file_handler as fh
+from utils.fingerprint import FingerprintCache
+
+if TYPE_CHECKING:
+    import polars as pl
+    from pandera import polars as pa
+
+    from .validation import ValidationBackend
+    from utils.profiler import Profiler
+
+
+FINGERPRINT_CACHE_NAME = ".fingerprints.json"
 
 
 class StagePipelineError(Exception):
     """Staging pipeline failed."""
 
 
-def stage_files(raw_dir: Path | str, staged_dir: Path | str) -> list[Outcome]:
+class StageValidationError(Exception):
+    """Staged data failed its schema check."""
+
+
+class StagePreflightError(Exception):
+    """Raw file does not have the structure its pipeline expects."""
+
+
+class StageNotInShardError(Exception):
+    """Raw file belongs to another worker's shard."""
+
+
+class StageClaimedError(Exception):
+    """Raw file is claimed by another worker."""
+
+
+class StageOptions(NamedTuple):
+    output_format: writer.StagedFormat = "parquet"
+    validation: ValidationBackend = "native"
+    lazy_validation: bool = False
+    # Where to write per-file metrics (JSON lines and a Prometheus textfile).
+    metrics_dir: Path | str | None = None
+    # Validate and write pipelines with a `parts_fn` one part at a time.
+    streaming: bool = False
+    # Collect spec-driven staging plans on polars' streaming engine.
+    streaming_engine: bool = False
+    # Where to cache parsed workbook sheets as Arrow IPC, and its size limit.
+    sheet_cache_dir: Path | str | None = None
+    sheet_cache_mb: int = 1024
+    # Check each file's sheets and headers before parsing it in full.
+    preflight: bool = True
+    # Where to write a cProfile, polars plans and validation timings per file.
+    profile_dir: Path | str | None = None
+    # Stage only the files of this shard, for several workers sharing a
+    # staged directory; and/or claim each file before staging it.
+    shard: Shard | None = None
+    claim: bool = False
+    claim_stale_seconds: float = DEFAULT_STALE_SECONDS
+    # Write this worker's results as a report of run `run_id`, to be merged.
+    run_id: str | None = None
+
+
+DEFAULT_OPTIONS = StageOptions()
+
+
+class StageResult(NamedTuple):
+    outcome: Outcome
+    message: str
+    metrics: FileMetrics
+
+
+def stage_files(
+    raw_dir: Path | str,
+    staged_dir: Path | str,
+    workers: int = 1,
+    verify: bool = False,
+    options: StageOptions = DEFAULT_OPTIONS,
+) -> list[StageResult]:
     log.log_starting_staging()
 
     if not registry.staging_pipelines:
         log.log_no_staging_pipelines_registered()
         return []
 
-    outcomes = []
-    for file_path in sorted(Path(raw_dir).iterdir()):
-        outcome, message = stage(file_path, Path(staged_dir))
-        log.log_outcome(outcome, message)
-        outcomes.append(outcome)
+    stage_dir_path = Path(staged_dir)
+    fingerprints = FingerprintCache(stage_dir_path / FINGERPRINT_CACHE_NAME, verify)
+    file_paths = sorted(Path(raw_dir).iterdir())
+    if workers > 1 and len(file_paths) > 1:
+        results = stage_parallel(
+            file_paths, stage_dir_path, workers, fingerprints, options
+        )
+    else:
+        results = (
+            stage(file_path, stage_dir_path, fingerprints, options)
+            for file_path in file_paths
+        )
+
+    stage_results = []
+    for result in results:
+        log.log_outcome(result.outcome, result.message)
+        stage_results.append(result)
+
+    fingerprints.save()
+    if options.run_id is not None:
+        write_run_report(stage_results, stage_dir_path, options)
+    if options.metrics_dir is not None:
+        metrics.write_metrics(
+            [result.metrics for result in stage_results], options.metrics_dir
+        )
+    log.log_staging_completed([result.outcome for result in stage_results])
+
+    return stage_results
+
+
+def write_run_report(
+    stage_results: list[StageResult], stage_dir_path: Path, options: StageOptions
+) -> None:
+    from . import report
+
+    report.write_report(
+        [(result.message, result.metrics) for result in stage_results],
+        stage_dir_path,
+        options.run_id,
+        shard.worker_id(),
+        str(options.shard) if options.shard is not None else None,
+    )
+
 
-    log.log_staging_completed(outcomes)
+def stage_parallel(
+    file_paths: Iterable[Path],
+    stage_dir_path: Path,
+    workers: int,
+    fingerprints: FingerprintCache | None = None,
+    options: StageOptions = DEFAULT_OPTIONS,
+) -> Iterator[StageResult]:
+    """
+    Run `stage` over `file_paths` in a pool of `workers` processes.
 
-    return outcomes
+    Results are yielded in the order of `file_paths`, so callers see the same
+    sequence as the serial path regardless of which file finishes first.
+    Digests recorded by the workers are merged back into `fingerprints`.
+    Workers are spawned rather than forked: a fork while polars' thread pool
+    is running copies its held locks, and the worker deadlocks.
+    """
+    file_paths = list(file_paths)
+    log.log_staging_workers(min(workers, len(file_paths)))
+    with ProcessPoolExecutor(
+        max_workers=min(workers, len(file_paths)),
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(sorted(registry.staging_packages),),
+    ) as executor:
+        stage_in_worker = partial(
+            _stage_in_worker,
+            stage_dir_path=stage_dir_path,
+            fingerprints=fingerprints,
+            options=options,
+        )
+        for result, recorded in executor.map(stage_in_worker, file_paths):
+            if fingerprints is not None:
+                fingerprints.update(recorded)
+            yield result
 
 
-def stage(file_path: Path, stage_dir_path: Path) -> tuple[Outcome, str]:
+def _init_worker(staging_packages: list[str]) -> None:
+    # Spawned workers start with an empty registry and rebuild it.
+    for package_name in staging_packages:
+        registry.load_staging_pipelines(importlib.import_module(package_name))
+
+
+def _stage_in_worker(
+    file_path: Path,
+    stage_dir_path: Path,
+    fingerprints: FingerprintCache | None,
+    options: StageOptions,
+) -> tuple[StageResult, dict]:
+    result = stage(file_path, stage_dir_path, fingerprints, options)
+    return result, fingerprints.recorded if fingerprints is not None else {}
+
+
+def stage(
+    file_path: Path,
+    stage_dir_path: Path,
+    fingerprints: FingerprintCache | None = None,
+    options: StageOptions = DEFAULT_OPTIONS,
+) -> StageResult:
+    """Stage one raw file, returning its outcome and per-phase metrics."""
+    recorder = metrics.Recorder(file_path)
+    outcome, message = stage_file(
+        file_path, stage_dir_path, fingerprints, options, recorder
+    )
+    return StageResult(outcome, message, recorder.finish(outcome))
+
+
+def stage_file(
+    file_path: Path,
+    stage_dir_path: Path,
+    fingerprints: FingerprintCache | None,
+    options: StageOptions,
+    recorder: metrics.Recorder,
+) -> tuple[Outcome, str]:
     file_hash = "NO FILE HASH"
     try:
-        file_hash = fh.hash_file(file_path)
-        staged_file_path = get_stage_file_path(file_hash, stage_dir_path)
+        with recorder.phase("hash"):
+            if fingerprints is not None:
+                file_hash = fingerprints.hash_file(file_path)
+            else:
+                file_hash = fh.hash_file(file_path)
+        recorder.file_hash = file_hash
+        if options.shard is not None and not options.shard.owns(file_hash):
+            raise StageNotInShardError(str(options.shard))
+        staged_file_path = get_stage_file_path(
+            file_hash, stage_dir_path, options.output_format
+        )
         staging_pipeline = registry.staging_pipelines[file_hash]
-        staged = run_staging_pipeline_func(file_path, staging_pipeline.pipeline_fn)
-        validated = staging_pipeline.stage_schema.validate(staged)
-        # validated.write_parquet(staged_file_path)
+        recorder.dataset = staging_pipeline.pipeline_fn.__module__
+        with (
+            use_claim(options, stage_dir_path, file_hash, staged_file_path),
+            use_profiler(options, file_hash) as profiler,
+        ):
+            if options.preflight and staging_pipeline.preflight_fn is not None:
+                with recorder.phase("preflight"):
+                    run_preflight(file_path, staging_pipeline.preflight_fn)
+            if options.streaming and staging_pipeline.parts_fn is not None:
+                with use_sheet_cache(options, file_hash):
+                    stage_parts(
+                        file_path,
+                        staged_file_path,
+                        staging_pipeline,
+                        options,
+                        recorder,
+                        profiler,
+                    )
+                return (
+                    Outcome.SUCCESS,
+                    f"'{file_path.name}' -> '{staged_file_path.name}/'",
+                )
+            with (
+                recorder.phase("pipeline"),
+                use_sheet_cache(options, file_hash),
+                use_streaming_engine(options),
+                profile_pipeline(profiler),
+            ):
+                staged = run_staging_pipeline_func(
+                    file_path, staging_pipeline.pipeline_fn
+                )
+            recorder.rows_in = staged.height
+            with recorder.phase("validate"):
+                validated = run_validation(
+                    staged, staging_pipeline.stage_schema, options
+                )
+            profile_validation(profiler, staged, staging_pipeline.stage_schema, options)
+            recorder.rows_out = validated.height
+            with recorder.phase("write"):
+                # An interrupted streaming run leaves a directory at this path.
+                writer.remove_parts(staged_file_path)
+                writer.write_staged(validated, staged_file_path, options.output_format)
+        recorder.bytes_out = staged_file_path.stat().st_size
         return Outcome.SUCCESS, f"'{file_path.name}' -> '{staged_file_path.name}'"
     except IsADirectoryError as err:
         return (Outcome.SKIPPED, f"File '{file_path.name}' is a directory")
@@ -54,22 +287,173 @@ def stage(file_path: Path, stage_dir_path: Path) -> tuple[Outcome, str]:
     except KeyError as err:
         msg = f"File '{file_path.name}' has no registered staging pipeline."
         return (Outcome.SKIPPED, msg)
+    except StageNotInShardError as err:
+        return Outcome.SKIPPED, f"File '{file_path.name}' is not in shard {err}"
+    except StageClaimedError as err:
+        return Outcome.SKIPPED, f"File '{file_path.name}' is claimed by {err}"
+    except StagePreflightError as err:
+        return Outcome.FAILED, f"Preflight check failed: {str(err)}"
     except StagePipelineError as err:
         return Outcome.FAILED, f"Staging pipeline function failed: {str(err)}"
-    except pae.SchemaError as err:
+    except StageValidationError as err:
         return Outcome.FAILED, f"Staged data failed schema check: {str(err)}"
     except Exception as err:
         return Outcome.FAILED, f"Unexpected {type(err).__name__}: {err}"
 
 
-def get_stage_file_path(file_hash: str, stage_dir_path: Path) -> Path:
-    staged_file_path = stage_dir_path / f"{file_hash}.parquet"
-    if staged_file_path.exists():
+def get_stage_file_path(
+    file_hash: str,
+    stage_dir_path: Path,
+    output_format: writer.StagedFormat = "parquet",
+) -> Path:
+    staged_file_path = stage_dir_path / writer.staged_file_name(
+        file_hash, output_format
+    )
+    if writer.is_staged(staged_file_path):
         raise FileExistsError(staged_file_path)
 
     return staged_file_path
 
 
+def stage_parts(
+    file_path: Path,
+    staged_file_path: Path,
+    staging_pipeline: registry.StagingPipeline,
+    options: StageOptions,
+    recorder: metrics.Recorder,
+    profiler: Profiler | None = None,
+) -> None:
+    """
+    Stage `file_path` as a directory of parts, one per `parts_fn` output.
+
+    Each part is validated and written before the next is produced, so
+    memory is bounded by the largest part rather than the whole file. The
+    directory only counts as staged once its manifest is written after the
+    last part; an interrupted attempt is cleared on the next run. Uniqueness
+    is checked within each part, which for fact workbooks is one metric.
+    Raises `StagePipelineError` if `parts_fn` yields no parts, as a staged
+    directory must hold at least one.
+    """
+    writer.clear_parts(staged_file_path)
+    parts = run_staging_parts_func(file_path, staging_pipeline.parts_fn)
+    part_names = []
+    while True:
+        with recorder.phase("pipeline"), profile_pipeline(profiler):
+            part = next(parts, None)
+        if part is None:
+            break
+        recorder.rows_in += part.height
+        with recorder.phase("validate"):
+            validated = run_validation(part, staging_pipeline.stage_schema, options)
+        profile_validation(profiler, part, staging_pipeline.stage_schema, options)
+        recorder.rows_out += validated.height
+        with recorder.phase("write"):
+            part_path = staged_file_path / writer.part_name(
+                len(part_names), options.output_format
+            )
+            writer.write_staged(validated, part_path, options.output_format)
+        recorder.bytes_out += part_path.stat().st_size
+        part_names.append(part_path.name)
+
+    if not part_names:
+        writer.remove_parts(staged_file_path)
+        raise StagePipelineError(f"'{file_path.name}' produced no parts")
+
+    with recorder.phase("write"):
+        writer.finish_parts(staged_file_path, part_names, recorder.rows_out)
+
+
+def use_sheet_cache(
+    options: StageOptions, file_hash: str
+) -> AbstractContextManager[None]:
+    from utils import sheet_cache
+
+    cache = None
+    if options.sheet_cache_dir is not None:
+        cache = sheet_cache.SheetCache(options.sheet_cache_dir, options.sheet_cache_mb)
+    return sheet_cache.use(cache, file_hash)
+
+
+def use_streaming_engine(options: StageOptions) -> AbstractContextManager[None]:
+    from staging import engine
+
+    return engine.use_streaming_engine(options.streaming_engine)
+
+
+@contextmanager
+def use_claim(
+    options: StageOptions,
+    stage_dir_path: Path,
+    file_hash: str,
+    staged_file_path: Path,
+) -> Iterator[None]:
+    """
+    Hold the claim on `file_hash` while it is staged, if claims are enabled.
+
+    Raises `StageClaimedError` if another worker holds it, and
+    `FileExistsError` if another worker staged the file before it was won.
+    """
+    if not options.claim:
+        yield
+        return
+
+    stage_dir_path.mkdir(parents=True, exist_ok=True)
+    path = shard.claim_path(stage_dir_path, file_hash)
+    with shard.claim(path, options.claim_stale_seconds) as claimed:
+        if not claimed:
+            owner = shard.read_owner(path)
+            raise StageClaimedError(
+                f"'{owner.get('host', '?')}' (pid {owner.get('pid', '?')})"
+            )
+        if writer.is_staged(staged_file_path):
+            raise FileExistsError(staged_file_path)
+        yield
+
+
+def use_profiler(
+    options: StageOptions, file_hash: str
+) -> AbstractContextManager[Profiler | None]:
+    from utils import profiler
+
+    return profiler.use(options.profile_dir, file_hash)
+
+
+def profile_pipeline(profiler: Profiler | None) -> AbstractContextManager[None]:
+    return nullcontext() if profiler is None else profiler.pipeline()
+
+
+def profile_validation(
+    profiler: Profiler | None,
+    data: pl.DataFrame,
+    schema: pa.DataFrameSchema,
+    options: StageOptions,
+) -> None:
+    """Time `schema`'s rules on `data` for the profile, apart from validation."""
+    if profiler is None:
+        return
+    from . import validation
+
+    profiler.add_validation(validation.time_rules(data, schema, options.validation))
+
+
+def run_preflight(file_path: Path, preflight_func: registry.PreflightFn) -> None:
+    try:
+        problems = preflight_func(file_path)
+    except Exception as err:
+        raise StagePreflightError(f"Could not read '{file_path.name}': {err}")
+    if problems:
+        raise StagePreflightError("; ".join(problems))
+
+
+def run_staging_parts_func(
+    file_path: Path, parts_func: registry.PartsFn
+) -> Iterator[pl.DataFrame]:
+    try:
+        yield from parts_func(file_path)
+    except Exception as err:
+        raise StagePipelineError(str(err))
+
+
 def run_staging_pipeline_func(
     file_path: Path, pipeline_func: registry.PipelineFn
 ) -> pl.DataFrame:
@@ -77,3 +461,20 @@ def run_staging_pipeline_func(
         return pipeline_func(file_path)
     except Exception as err:
         raise StagePipelineError(str(err))
+
+
+def run_validation(
+    data: pl.DataFrame, schema: pa.DataFrameSchema, options: StageOptions
+) -> pl.DataFrame:
+    # pandera is slow to import, so it is only loaded once a file needs
+    # validating; no-op runs never pay for it.
+    from pandera import errors as pae
+
+    from . import validation
+
+    try:
+        return validation.validate(
+            data, schema, options.validation, options.lazy_validation
+        )
+    except (pae.SchemaError, pae.SchemaErrors) as err:
+        raise StageValidationError(str(err))
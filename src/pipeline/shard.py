@@ -0,0 +1,190 @@
+"""pipeline.shard.py"""
+
+import json
+import os
+import socket
+import threading
+import time
+import uuid
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from typing import NamedTuple
+
+
+CLAIM_SUFFIX = ".claim"
+BREAK_SUFFIX = ".break"
+# Claims not touched for this long are taken to be left by a crashed worker.
+# A held claim is touched several times per period, so a long stage keeps it.
+DEFAULT_STALE_SECONDS = 3600.0
+HEARTBEATS_PER_STALE = 4
+
+
+class Shard(NamedTuple):
+    """The `index`th of `count` disjoint slices of the raw files, by hash."""
+
+    index: int
+    count: int
+
+    @classmethod
+    def parse(cls, text: str) -> "Shard":
+        """Parse "I/N", e.g. "0/4" for the first of four shards."""
+        index, _, count = text.partition("/")
+        shard = cls(int(index), int(count))
+        if not 0 <= shard.index < shard.count:
+            raise ValueError(f"Shard '{text}' is not 'I/N' with 0 <= I < N.")
+        return shard
+
+    def owns(self, file_hash: str) -> bool:
+        # sha256 digests are uniform, so shards are evenly sized, and every
+        # worker agrees on the owner of a file without coordinating.
+        return int(file_hash, 16) % self.count == self.index
+
+    def __str__(self) -> str:
+        return f"{self.index}/{self.count}"
+
+
+def worker_id() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+def claim_path(stage_dir_path: Path, file_hash: str) -> Path:
+    return stage_dir_path / f"{file_hash}{CLAIM_SUFFIX}"
+
+
+@contextmanager
+def claim(path: Path, stale_seconds: float = DEFAULT_STALE_SECONDS) -> Iterator[bool]:
+    """
+    Hold the claim file at `path` for the duration, yielding whether it was won.
+
+    A claim is a file created with `O_EXCL`, which is atomic on local and NFS
+    filesystems alike, so of any number of workers only one holds it. A held
+    claim is touched in the background so it never looks stale however long
+    the stage takes. A claim left by a crashed worker is broken once it has
+    not been touched for `stale_seconds`, or at once if its worker ran on
+    this host and is no longer alive.
+    """
+    token = acquire(path, stale_seconds)
+    if token is None:
+        yield False
+        return
+
+    stopping = threading.Event()
+    heartbeat = threading.Thread(
+        target=keep_alive,
+        args=(path, token, stale_seconds / HEARTBEATS_PER_STALE, stopping),
+        daemon=True,
+    )
+    heartbeat.start()
+    try:
+        yield True
+    finally:
+        stopping.set()
+        heartbeat.join()
+        release(path, token)
+
+
+def acquire(path: Path, stale_seconds: float = DEFAULT_STALE_SECONDS) -> str | None:
+    """Create the claim at `path`, returning its token, or `None` if it is held."""
+    token = uuid.uuid4().hex
+    owner = {
+        "token": token,
+        "host": socket.gethostname(),
+        "pid": os.getpid(),
+        "claimed_at": time.time(),
+    }
+    # A second attempt follows breaking a stale claim; if that is lost to
+    # another worker, the claim is theirs.
+    for _ in range(2):
+        try:
+            fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+        except FileExistsError:
+            if not break_stale(path, stale_seconds):
+                return None
+            continue
+        with os.fdopen(fd, "w") as f:
+            json.dump(owner, f)
+        return token
+
+    return None
+
+
+def release(path: Path, token: str) -> None:
+    """Delete the claim at `path` if it is still the one with `token`."""
+    if read_owner(path).get("token") == token:
+        path.unlink(missing_ok=True)
+
+
+def keep_alive(
+    path: Path, token: str, interval: float, stopping: threading.Event
+) -> None:
+    """Touch the claim at `path` every `interval` while it is the one with `token`."""
+    while not stopping.wait(interval):
+        if read_owner(path).get("token") != token:
+            return
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return
+
+
+def break_stale(path: Path, stale_seconds: float) -> bool:
+    """
+    Remove the claim at `path` if it is stale, returning whether it was.
+
+    Workers that find the same stale claim race to create a break marker
+    named after its token, with `O_EXCL`, so only one of them removes it; the
+    others leave the claim to the winner, who by then may have re-claimed it.
+    A marker left by a worker that crashed while breaking is itself broken
+    once it is `stale_seconds` old.
+    """
+    # A claim left empty by a crash has no token, and is broken by age alone.
+    token = read_owner(path).get("token", "")
+    if not is_stale(path, stale_seconds):
+        return False
+    marker = path.with_name(f".{path.name}.{token}{BREAK_SUFFIX}")
+    try:
+        os.close(os.open(marker, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644))
+    except FileExistsError:
+        if is_stale(marker, stale_seconds):
+            marker.unlink(missing_ok=True)
+        return False
+    try:
+        # The claim judged stale may have been released, and replaced, since.
+        if read_owner(path).get("token", "") != token or not is_stale(
+            path, stale_seconds
+        ):
+            return False
+        path.unlink(missing_ok=True)
+        return True
+    finally:
+        marker.unlink(missing_ok=True)
+
+
+def is_stale(path: Path, stale_seconds: float) -> bool:
+    try:
+        age = time.time() - path.stat().st_mtime
+    except FileNotFoundError:
+        return False
+    owner = read_owner(path)
+    if owner.get("host") == socket.gethostname() and not pid_alive(owner["pid"]):
+        return True
+    return age > stale_seconds
+
+
+def read_owner(path: Path) -> dict:
+    # A claim is empty, or partly written, for a moment after it is created.
+    try:
+        return json.loads(path.read_text())
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
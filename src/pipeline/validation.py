@@ -0,0 +1,301 @@
+"""pipeline.validation.py"""
+
+import time
+from functools import reduce
+from typing import Literal, NamedTuple
+
+import polars as pl
+from pandera import errors as pae
+from pandera import polars as pa
+from pandera.errors import SchemaErrorReason
+
+
+ValidationBackend = Literal["native", "pandera"]
+
+
+class LazySchemaError(pae.SchemaError):
+    """Every failure found by a lazy native validation pass."""
+
+    def __init__(
+        self,
+        schema: pa.DataFrameSchema,
+        data: pl.DataFrame,
+        schema_errors: list[pae.SchemaError],
+    ):
+        message = f"{len(schema_errors)} schema errors:\n" + "\n".join(
+            f"- {err}" for err in schema_errors
+        )
+        super().__init__(
+            schema, data, message, reason_code=schema_errors[0].reason_code
+        )
+        self.schema_errors = schema_errors
+
+
+class ColumnRule(NamedTuple):
+    name: str
+    dtype: pl.DataType
+    nullable: bool
+    unique: bool
+    required: bool
+    coerce: bool
+
+
+class CompiledSchema:
+    """
+    A pandera polars `DataFrameSchema` compiled to native polars expressions.
+
+    Supports the column-set (`strict`), dtype, `nullable`, column `unique` and
+    schema `unique` rules; schemas with custom checks, regex columns or
+    parsers are rejected with `NotImplementedError`.
+    """
+
+    def __init__(self, schema: pa.DataFrameSchema):
+        if schema.checks or schema.parsers or schema.add_missing_columns:
+            raise NotImplementedError(f"Schema '{schema.name}' has unsupported rules.")
+        for name, col in schema.columns.items():
+            if col.checks or col.parsers or col.regex or col.dtype is None:
+                raise NotImplementedError(f"Column '{name}' has unsupported rules.")
+
+        self.schema = schema
+        self.rules = [
+            ColumnRule(
+                name,
+                col.dtype.type,
+                col.nullable,
+                col.unique,
+                col.required,
+                schema.coerce or col.coerce,
+            )
+            for name, col in schema.columns.items()
+        ]
+        self.unique = (
+            [schema.unique] if isinstance(schema.unique, str) else schema.unique
+        )
+
+    def validate(self, data: pl.DataFrame, lazy: bool = False) -> pl.DataFrame:
+        """
+        Validate (and coerce) `data`, raising `pae.SchemaError` on failure.
+
+        With `lazy`, every failure is collected and raised together as
+        `LazySchemaError` instead of stopping at the first.
+        """
+        errors: list[pae.SchemaError] = []
+
+        def fail(message: str, reason_code: SchemaErrorReason, **kwargs) -> None:
+            err = pae.SchemaError(
+                self.schema, data, message, reason_code=reason_code, **kwargs
+            )
+            if not lazy:
+                raise err
+            errors.append(err)
+
+        names = [rule.name for rule in self.rules]
+        if self.schema.strict == "filter":
+            data = data.select(col for col in data.columns if col in names)
+        elif self.schema.strict:
+            for col in data.columns:
+                if col not in names:
+                    fail(
+                        f"column '{col}' not in DataFrameSchema {self.schema.columns}",
+                        SchemaErrorReason.COLUMN_NOT_IN_SCHEMA,
+                        failure_cases=col,
+                        column_name=col,
+                    )
+
+        rules = []
+        for rule in self.rules:
+            if rule.name in data.columns:
+                rules.append(rule)
+            elif rule.required:
+                fail(
+                    f"column '{rule.name}' not in dataframe. "
+                    f"Columns in dataframe: {data.columns}",
+                    SchemaErrorReason.COLUMN_NOT_IN_DATAFRAME,
+                    failure_cases=rule.name,
+                    column_name=rule.name,
+                )
+
+        coerced = data.with_columns(
+            pl.col(rule.name).cast(rule.dtype, strict=False)
+            for rule in rules
+            if rule.coerce and data.schema[rule.name] != rule.dtype
+        )
+
+        for rule in rules:
+            dtype = data.schema[rule.name]
+            failed = coerced[rule.name].null_count() - data[rule.name].null_count()
+            if rule.coerce and failed:
+                failure_cases = failure_rows(
+                    data, data[rule.name].is_not_null() & coerced[rule.name].is_null()
+                ).select("index", pl.col(rule.name).alias("failure_case"))
+                fail(
+                    f"Could not coerce column '{rule.name}' from {dtype} to "
+                    f"{rule.dtype}: {failed} values failed:\n{failure_cases}",
+                    SchemaErrorReason.DATATYPE_COERCION,
+                    failure_cases=failure_cases,
+                    column_name=rule.name,
+                )
+            elif not rule.coerce and dtype != rule.dtype:
+                fail(
+                    f"expected column '{rule.name}' to have type {rule.dtype}, "
+                    f"got {dtype}",
+                    SchemaErrorReason.WRONG_DATATYPE,
+                    failure_cases=str(dtype),
+                    column_name=rule.name,
+                )
+
+        duplicated = self.duplicated(coerced, rules)
+        for key, mask in duplicated.items():
+            # As in pandera, a schema-wide key reports the whole failing rows.
+            failure_cases = failure_rows(coerced, mask)
+            if len(key) == 1:
+                failure_cases = failure_cases.select("index", *key)
+                message = f"column '{key[0]}' not unique:\n"
+                reason_code = SchemaErrorReason.SERIES_CONTAINS_DUPLICATES
+            else:
+                message = f"columns '{tuple(key)}' not unique:\n"
+                reason_code = SchemaErrorReason.DUPLICATES
+            fail(
+                f"{message}{failure_cases}",
+                reason_code,
+                failure_cases=failure_cases,
+                column_name=key[0] if len(key) == 1 else None,
+            )
+
+        # Values that failed to coerce are null in `coerced` but were reported
+        # above, so only values null before coercion count here.
+        for rule in rules:
+            if not rule.nullable and data[rule.name].null_count():
+                failure_cases = failure_rows(coerced, data[rule.name].is_null()).select(
+                    "index", pl.col(rule.name).alias("failure_case")
+                )
+                fail(
+                    f"non-nullable column '{rule.name}' contains null values",
+                    SchemaErrorReason.SERIES_CONTAINS_NULLS,
+                    failure_cases=failure_cases,
+                    column_name=rule.name,
+                )
+
+        if errors:
+            raise LazySchemaError(self.schema, data, errors)
+
+        return coerced
+
+    def duplicated(
+        self, data: pl.DataFrame, rules: list[ColumnRule]
+    ) -> dict[tuple[str, ...], pl.Series]:
+        """Return a duplicate mask per failing key, computed in a single pass."""
+        keys = [(rule.name,) for rule in rules if rule.unique]
+        if self.unique and all(col in data.columns for col in self.unique):
+            keys.append(tuple(self.unique))
+        if not keys:
+            return {}
+
+        # Equal keys have equal hashes, so all-distinct hashes prove uniqueness
+        # without hashing the key columns as one struct; only keys with a
+        # collision pay for the exact check.
+        n_distinct = data.select(
+            key_hash(key).n_unique().alias(str(i)) for i, key in enumerate(keys)
+        ).row(0)
+        keys = [key for key, n in zip(keys, n_distinct) if n < data.height]
+        if not keys:
+            return {}
+
+        masks = data.select(
+            pl.struct(key).is_duplicated().alias(str(i)) for i, key in enumerate(keys)
+        )
+        return {key: mask for key, mask in zip(keys, masks) if mask.any()}
+
+
+compiled_schemas: dict[int, CompiledSchema] = {}
+
+
+def compile_schema(schema: pa.DataFrameSchema) -> CompiledSchema:
+    # Schemas are unhashable module-level constants, so cache on identity.
+    if id(schema) not in compiled_schemas:
+        compiled_schemas[id(schema)] = CompiledSchema(schema)
+
+    return compiled_schemas[id(schema)]
+
+
+def validate(
+    data: pl.DataFrame,
+    schema: pa.DataFrameSchema,
+    backend: ValidationBackend = "native",
+    lazy: bool = False,
+) -> pl.DataFrame:
+    """
+    Validate `data` against `schema`, falling back to pandera when needed.
+
+    pandera can't validate polars frames lazily, so `lazy` needs the native
+    backend; a schema native validation can't compile is validated eagerly.
+    """
+    if lazy and backend != "native":
+        raise ValueError("Lazy validation is only supported by the native backend.")
+    if backend == "native":
+        try:
+            compiled = compile_schema(schema)
+        except NotImplementedError:
+            pass
+        else:
+            return compiled.validate(data, lazy=lazy)
+
+    return schema.validate(data)
+
+
+def time_rules(
+    data: pl.DataFrame,
+    schema: pa.DataFrameSchema,
+    backend: ValidationBackend = "native",
+) -> dict[str, float]:
+    """
+    Time validating `data` against each rule of `schema` on its own.
+
+    Each column is validated alone, and the schema-wide `unique` rule with
+    just its key columns, using `backend`; "total" is the whole schema.
+    Returns seconds by rule. Failures are timed too, up to where they raise.
+    """
+    unique = [schema.unique] if isinstance(schema.unique, str) else schema.unique
+    rules = {
+        f"column:{name}": pa.DataFrameSchema({name: col}, coerce=schema.coerce)
+        for name, col in schema.columns.items()
+    }
+    if unique:
+        rules[f"unique:{','.join(unique)}"] = pa.DataFrameSchema(
+            {name: schema.columns[name] for name in unique},
+            coerce=schema.coerce,
+            unique=unique,
+        )
+    rules["total"] = schema
+
+    timings = {}
+    for rule, rule_schema in rules.items():
+        columns = [col for col in rule_schema.columns if col in data.columns]
+        frame = data if rule_schema is schema else data.select(columns)
+        # Sub-schemas are compiled directly; `compile_schema` caches on id.
+        validator = rule_schema.validate
+        if backend == "native":
+            try:
+                validator = CompiledSchema(rule_schema).validate
+            except NotImplementedError:
+                pass
+        start = time.perf_counter()
+        try:
+            validator(frame)
+        except (pae.SchemaError, pae.SchemaErrors):
+            pass
+        timings[rule] = time.perf_counter() - start
+
+    return timings
+
+
+def key_hash(key: tuple[str, ...]) -> pl.Expr:
+    return reduce(
+        lambda acc, col: acc.hash(1) ^ pl.col(col).hash(),
+        key[1:],
+        pl.col(key[0]).hash(),
+    )
+
+
+def failure_rows(data: pl.DataFrame, mask: pl.Series) -> pl.DataFrame:
+    return data.with_row_index("index").filter(mask)
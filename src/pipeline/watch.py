@@ -0,0 +1,154 @@
+"""pipeline.watch.py"""
+
+import os
+import signal
+import threading
+import time
+from pathlib import Path
+from typing import NamedTuple
+
+from . import log
+from . import metrics
+from . import registry
+from . import runner
+from .outcome import Outcome
+from utils.fingerprint import Fingerprint, FingerprintCache
+
+
+# Outcomes that stand until the file changes; anything else is retried.
+SETTLED = {Outcome.SUCCESS, Outcome.SKIPPED}
+
+
+class Pending(NamedTuple):
+    fingerprint: Fingerprint
+    # When the file was first seen with this fingerprint.
+    since: float
+
+
+class Watcher:
+    """
+    Poll `raw_dir` and stage files that are new or changed once they settle.
+
+    Changes are detected from `os.scandir` stat results alone. A file is
+    staged only after its size, mtime and inode have held still for
+    `settle` seconds, so files that are still being copied in are left
+    alone. Each settled file goes through `runner.stage`, and its outcome is
+    logged as in a one-shot run. A file that fails is retried once it has
+    settled again, so a transient error does not need the file to change.
+    """
+
+    def __init__(
+        self,
+        raw_dir: Path | str,
+        staged_dir: Path | str,
+        interval: float = 2.0,
+        settle: float = 5.0,
+        verify: bool = False,
+        options: runner.StageOptions = runner.DEFAULT_OPTIONS,
+    ):
+        self.raw_dir = Path(raw_dir)
+        self.staged_dir = Path(staged_dir)
+        self.interval = interval
+        self.settle = settle
+        self.options = options
+        self.fingerprints = FingerprintCache(
+            self.staged_dir / runner.FINGERPRINT_CACHE_NAME, verify
+        )
+        self.staged: dict[Path, Fingerprint] = {}
+        self.pending: dict[Path, Pending] = {}
+        self.stopping = threading.Event()
+
+    def run(self) -> None:
+        """Poll until `stop` is called or SIGINT/SIGTERM is received."""
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, lambda *_: self.stop())
+
+        warm_up()
+        log.log_watching(self.raw_dir, self.interval)
+        while not self.stopping.is_set():
+            self.poll()
+            self.stopping.wait(self.interval)
+
+        self.fingerprints.save()
+        log.log_watch_stopped()
+
+    def stop(self) -> None:
+        # The file being staged is finished; nothing new is started.
+        self.stopping.set()
+
+    def poll(self) -> list[runner.StageResult]:
+        """Scan once and stage every file that has settled since the last scan."""
+        now = time.monotonic()
+        current = scan(self.raw_dir)
+        for path in self.staged.keys() - current.keys():
+            del self.staged[path]
+        for path in self.pending.keys() - current.keys():
+            del self.pending[path]
+
+        ready = []
+        for path, fingerprint in current.items():
+            if self.staged.get(path) == fingerprint:
+                continue
+            pending = self.pending.get(path)
+            if pending is None or pending.fingerprint != fingerprint:
+                self.pending[path] = Pending(fingerprint, now)
+            elif now - pending.since >= self.settle:
+                ready.append(path)
+
+        results = []
+        for path in sorted(ready):
+            if self.stopping.is_set():
+                break
+            result = runner.stage(
+                path, self.staged_dir, self.fingerprints, self.options
+            )
+            log.log_outcome(result.outcome, result.message)
+            fingerprint = self.pending.pop(path).fingerprint
+            if result.outcome in SETTLED:
+                self.staged[path] = fingerprint
+            results.append(result)
+
+        if results:
+            self.fingerprints.save()
+            if self.options.metrics_dir is not None:
+                metrics.write_metrics(
+                    [result.metrics for result in results], self.options.metrics_dir
+                )
+
+        return results
+
+
+def scan(raw_dir: Path) -> dict[Path, Fingerprint]:
+    fingerprints = {}
+    with os.scandir(raw_dir) as entries:
+        for entry in entries:
+            if entry.name.startswith(".") or not entry.is_file():
+                continue
+            stat = entry.stat()
+            fingerprints[Path(entry.path)] = Fingerprint(
+                stat.st_size, stat.st_mtime_ns, stat.st_ino
+            )
+
+    return fingerprints
+
+
+def warm_up() -> None:
+    """
+    Import every registered pipeline and compile its schema up front.
+
+    A module that fails to import is logged and skipped; its files fail with
+    the same error when they are staged, without stopping the watcher.
+    """
+    from . import validation
+
+    for file_hash, module_name in list(registry.staging_pipelines.manifest.items()):
+        try:
+            staging_pipeline = registry.staging_pipelines[file_hash]
+        except Exception as err:
+            log.log_pipeline_import_failed(module_name, err)
+            continue
+        try:
+            validation.compile_schema(staging_pipeline.stage_schema)
+        except NotImplementedError:
+            # Validated by pandera instead, which the import above has loaded.
+            pass
@@ -0,0 +1,154 @@
+"""pipeline.writer.py"""
+
+from __future__ import annotations
+
+import json
+import os
+from pathlib import Path
+from typing import TYPE_CHECKING, Literal
+
+if TYPE_CHECKING:
+    import polars as pl
+
+
+StagedFormat = Literal["parquet", "ipc"]
+
+SUFFIXES: dict[str, str] = {"parquet": ".parquet", "ipc": ".arrow"}
+SORT_KEY = ["code", "local_authority_key", "period"]
+PARQUET_OPTIONS = {
+    "compression": "zstd",
+    "compression_level": 3,
+    "statistics": True,
+    "row_group_size": 64 * 1024,
+}
+# A streamed file is staged as a directory of parts named like a staged file;
+# it is complete only once its manifest has been written.
+PARTS_MANIFEST = "_manifest.json"
+
+
+def staged_file_name(file_hash: str, output_format: StagedFormat = "parquet") -> str:
+    return f"{file_hash}{SUFFIXES[output_format]}"
+
+
+def write_staged(
+    data: pl.DataFrame,
+    path: Path,
+    output_format: StagedFormat = "parquet",
+    sort_key: list[str] = SORT_KEY,
+) -> Path:
+    """
+    Atomically write `data` to `path` as parquet or uncompressed Arrow IPC.
+
+    Rows are sorted on whichever `sort_key` columns are present so that row
+    group statistics are selective. The frame is written to a temporary file
+    in the same directory, flushed to disk and renamed over `path`, so readers
+    only ever see a complete file.
+    """
+    if output_format not in SUFFIXES:
+        raise ValueError(f"Unsupported staged output format '{output_format}'.")
+
+    sort_key = [col for col in sort_key if col in data.columns]
+    if sort_key:
+        data = data.sort(sort_key, maintain_order=True)
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    try:
+        if output_format == "parquet":
+            data.write_parquet(tmp_path, **PARQUET_OPTIONS)
+        else:
+            # Uncompressed so consumers can memory-map the buffers directly.
+            data.write_ipc(tmp_path, compression="uncompressed")
+        fsync(tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+    return path
+
+
+def part_name(index: int, output_format: StagedFormat = "parquet") -> str:
+    return f"part-{index:05d}{SUFFIXES[output_format]}"
+
+
+def clear_parts(path: Path) -> None:
+    """Create the parts directory `path`, removing any interrupted attempt."""
+    path.mkdir(parents=True, exist_ok=True)
+    for stale in path.iterdir():
+        stale.unlink()
+
+
+def remove_parts(path: Path) -> None:
+    """Remove the parts directory `path`, if an interrupted attempt left one."""
+    if path.is_dir():
+        clear_parts(path)
+        path.rmdir()
+
+
+def finish_parts(path: Path, part_names: list[str], row_count: int) -> Path:
+    """Atomically write the manifest that marks the parts in `path` complete."""
+    manifest_path = path / PARTS_MANIFEST
+    tmp_path = path / f".{PARTS_MANIFEST}.{os.getpid()}.tmp"
+    tmp_path.write_text(json.dumps({"parts": part_names, "rows": row_count}))
+    fsync(tmp_path)
+    os.replace(tmp_path, manifest_path)
+
+    return path
+
+
+def is_staged(path: Path) -> bool:
+    """Return whether `path` is a staged file or a complete parts directory."""
+    return path.is_file() or (path / PARTS_MANIFEST).is_file()
+
+
+def staged_paths(
+    staged_dir: Path | str, output_format: StagedFormat | None = None
+) -> list[Path]:
+    """
+    Return every staged file and complete parts directory in `staged_dir`.
+
+    Only those in `output_format` are returned, if given; otherwise all.
+    """
+    suffixes = SUFFIXES.values() if output_format is None else [SUFFIXES[output_format]]
+    return sorted(
+        path
+        for suffix in suffixes
+        for path in Path(staged_dir).glob(f"*{suffix}")
+        if is_staged(path)
+    )
+
+
+def staged_at(path: Path) -> int:
+    """Return when `path` was staged, in ns; a parts directory by its manifest."""
+    if path.is_file():
+        return path.stat().st_mtime_ns
+    return (path / PARTS_MANIFEST).stat().st_mtime_ns
+
+
+def oldest_first(paths: list[Path]) -> list[Path]:
+    """Order staged `paths` by when they were staged, so newer editions last."""
+    return sorted(paths, key=lambda path: (staged_at(path), path.name))
+
+
+def part_paths(path: Path) -> list[Path]:
+    """Return the files holding the staged data at `path`."""
+    if path.is_file():
+        return [path]
+    manifest = json.loads((path / PARTS_MANIFEST).read_text())
+    return [path / part for part in manifest["parts"]]
+
+
+def scan_staged(path: Path) -> pl.LazyFrame:
+    """Scan the staged file or parts directory at `path`, in its format."""
+    import polars as pl
+
+    paths = part_paths(path)
+    if path.suffix == SUFFIXES["ipc"]:
+        return pl.scan_ipc(paths, memory_map=True)
+    return pl.scan_parquet(paths)
+
+
+def fsync(path: Path) -> None:
+    with path.open("rb") as f:
+        os.fsync(f.fileno())
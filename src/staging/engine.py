@@ -0,0 +1,269 @@
+"""staging/engine.py"""
+
+import re
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import partial
+from pathlib import Path
+from typing import Literal, NamedTuple
+
+import fastexcel
+import polars as pl
+from polars import selectors as cs
+
+from utils import gss
+from utils import profiler
+from utils import workbook
+from utils import xlsx_probe
+
+
+YEAR_COLUMNS = r"^(\d{4})$"
+LOCAL_AUTHORITY_CODES = r"^[EW]\d{8}$"
+
+# Staging modules only pass `source` and `spec`, so the runner picks the
+# engine `stage` collects on through this context variable.
+streaming_engine: ContextVar[bool] = ContextVar("streaming_engine", default=False)
+
+
+class WorkbookSpec(NamedTuple):
+    """
+    Declarative description of a fact workbook.
+
+    `sheet_metric` maps each sheet name to its `metric`, `code` and `unit`.
+    A "wide" sheet holds one column per 4-digit year; a "long" sheet holds a
+    `period_col` column and a `value_col` column per row.
+    """
+
+    metric_group: str
+    sheet_metric: dict[str, dict[str, str]]
+    local_authority_col: str
+    read_options: workbook.ReadOptions
+    layout: Literal["wide", "long"] = "wide"
+    period_col: str = "Period"
+    value_col: str = "Value"
+    drop_nulls: bool = True
+
+
+def stage(
+    source: Path | str, spec: WorkbookSpec, streaming: bool | None = None
+) -> pl.DataFrame:
+    """
+    Stage the workbook at `source` by collecting its plan once.
+
+    The plan is collected on polars' streaming engine if `streaming`, or, by
+    default, inside `use_streaming_engine(True)`.
+    """
+    if streaming is None:
+        streaming = streaming_engine.get()
+    plan = build_plan(source, spec)
+    engine = "streaming" if streaming else "auto"
+    active = profiler.active_profiler.get()
+    if active is not None:
+        return active.collect(plan, "stage", engine)
+    return plan.collect(engine=engine)
+
+
+@contextmanager
+def use_streaming_engine(enabled: bool) -> Iterator[None]:
+    """Collect `stage` plans on the streaming engine while `enabled`."""
+    token = streaming_engine.set(enabled)
+    try:
+        yield
+    finally:
+        streaming_engine.reset(token)
+
+
+def stage_parts(source: Path | str, spec: WorkbookSpec) -> Iterator[pl.DataFrame]:
+    """
+    Stage the workbook at `source` one sheet at a time.
+
+    Each sheet is read, staged and yielded before the next is read, so only
+    one sheet's data is held at once. Concatenated, the parts equal `stage`.
+    """
+    read_options = {**spec.read_options, "use_columns": used_columns(spec)}
+    sheets = dict.fromkeys(spec.sheet_metric, read_options)
+    active = profiler.active_profiler.get()
+    for sheet_name, data in workbook.iter_sheets(source, sheets):
+        plan = sheet_plan(sheet_name, data, spec, Path(source).name)
+        yield plan.collect() if active is None else active.collect(plan, sheet_name)
+
+
+def parts(spec: WorkbookSpec) -> Callable[[Path | str], Iterator[pl.DataFrame]]:
+    """Return the `parts_fn` that streams workbooks described by `spec`."""
+    return partial(stage_parts, spec=spec)
+
+
+def build_plan(source: Path | str, spec: WorkbookSpec) -> pl.LazyFrame:
+    """
+    Return one lazy plan covering every sheet in `spec`.
+
+    Sheets are parsed eagerly (Excel cannot be scanned lazily), then each is
+    cleaned, reshaped and annotated lazily and the plans are concatenated, so
+    polars optimises and executes them together on `collect`. Only the columns
+    the spec uses are converted by the reader.
+    """
+    source_name = Path(source).name
+    read_options = {**spec.read_options, "use_columns": used_columns(spec)}
+    sheets = dict.fromkeys(spec.sheet_metric, read_options)
+    return pl.concat(
+        workbook.map_sheets(
+            source,
+            sheets,
+            lambda sheet_name, data: sheet_plan(sheet_name, data, spec, source_name),
+        )
+    )
+
+
+def sheet_plan(
+    sheet_name: str, data: pl.DataFrame, spec: WorkbookSpec, source_name: str
+) -> pl.LazyFrame:
+    transformed = transform(clean(data.lazy(), spec), spec)
+    return annotate(
+        transformed,
+        metric_group=spec.metric_group,
+        **spec.sheet_metric[sheet_name],
+        source=source_name,
+    )
+
+
+class UsedColumns(NamedTuple):
+    """
+    fastexcel `use_columns` predicate for the columns `clean` reads.
+
+    A NamedTuple rather than a closure, so its `repr` is stable and the
+    sheet cache can key on it.
+    """
+
+    local_authority_col: str
+    patterns: tuple[str, ...]
+
+    def __call__(self, column: fastexcel.ColumnInfoNoDtype) -> bool:
+        return column.name == self.local_authority_col or any(
+            re.search(pattern, column.name) for pattern in self.patterns
+        )
+
+
+def used_columns(spec: WorkbookSpec) -> UsedColumns:
+    """Return a fastexcel `use_columns` predicate for the columns `clean` reads."""
+    if spec.layout == "long":
+        patterns = (spec.period_col, f"^{re.escape(spec.value_col)}")
+    else:
+        patterns = (YEAR_COLUMNS,)
+
+    return UsedColumns(spec.local_authority_col, patterns)
+
+
+def check_structure(source: Path | str, spec: WorkbookSpec) -> list[str]:
+    """
+    Check the workbook at `source` has the sheets and header columns of `spec`.
+
+    For xlsx, only sheet names and the rows around each header are read, so a
+    broken workbook is caught in milliseconds, before any sheet is parsed.
+    Other formats are checked by loading each header through fastexcel.
+    Returns one message per problem.
+    """
+    header_row = spec.read_options.get("header_row", 0)
+    if Path(source).suffix.lower() in xlsx_probe.SUFFIXES:
+        with xlsx_probe.WorkbookProbe(source) as probe:
+            return check_headers(
+                spec,
+                probe.sheet_names,
+                lambda sheet_name: header_names(*probe.header(sheet_name, header_row)),
+            )
+
+    reader = fastexcel.read_excel(source)
+    return check_headers(
+        spec,
+        reader.sheet_names,
+        lambda sheet_name: (
+            reader.load_sheet(sheet_name, header_row=header_row, n_rows=0)
+            .to_polars()
+            .columns
+        ),
+    )
+
+
+def check_headers(
+    spec: WorkbookSpec,
+    sheet_names: list[str],
+    read_columns: Callable[[str], list[str]],
+) -> list[str]:
+    """Check `spec` against a workbook's sheet names and its header columns."""
+    header_row = spec.read_options.get("header_row", 0)
+    required = used_columns(spec)
+    problems = []
+    for sheet_name in spec.sheet_metric:
+        if sheet_name not in sheet_names:
+            problems.append(f"Sheet '{sheet_name}' not found; found {sheet_names}")
+            continue
+        columns = read_columns(sheet_name)
+        missing = [
+            f"'{col}'" for col in [required.local_authority_col] if col not in columns
+        ] + [
+            f"/{pattern}/"
+            for pattern in required.patterns
+            if not any(re.search(pattern, col) for col in columns)
+        ]
+        if missing:
+            problems.append(
+                f"Sheet '{sheet_name}' header row {header_row} has no column "
+                f"matching {', '.join(missing)}; found {columns}"
+            )
+
+    return problems
+
+
+def header_names(header: xlsx_probe.Row, first_col: int) -> list[str]:
+    """Return the column names fastexcel gives `header`, numbered from `first_col`."""
+    last_col = max(header, default=first_col - 1)
+    return [
+        header.get(col) or f"__UNNAMED__{col - first_col}"
+        for col in range(first_col, last_col + 1)
+    ]
+
+
+def preflight(spec: WorkbookSpec) -> Callable[[Path | str], list[str]]:
+    """Return the `preflight_fn` that checks workbooks against `spec`."""
+    return partial(check_structure, spec=spec)
+
+
+def clean(data: pl.LazyFrame, spec: WorkbookSpec) -> pl.LazyFrame:
+    local_authority_code = pl.col(spec.local_authority_col)
+    data = data.filter(local_authority_code.str.contains(LOCAL_AUTHORITY_CODES))
+    if spec.layout == "long":
+        return data.select(
+            gss.encode_expr(local_authority_code).alias("local_authority_key"),
+            cs.matches(spec.period_col).str.extract(r"^(\d{4})").alias("period"),
+            cs.starts_with(spec.value_col)
+            .alias("value")
+            .cast(pl.Float64, strict=False),
+        )
+
+    return data.select(
+        gss.encode_expr(local_authority_code).alias("local_authority_key"),
+        cs.matches(YEAR_COLUMNS).cast(pl.Float64, strict=False),
+    )
+
+
+def transform(data: pl.LazyFrame, spec: WorkbookSpec) -> pl.LazyFrame:
+    if spec.layout == "wide":
+        data = data.unpivot(
+            on=cs.matches(YEAR_COLUMNS),
+            index="local_authority_key",
+            variable_name="period",
+        )
+    if not spec.drop_nulls:
+        return data
+    if spec.layout == "long":
+        return data.drop_nulls()
+    return data.drop_nulls("value")
+
+
+def annotate(data: pl.LazyFrame, **cols: str) -> pl.LazyFrame:
+    return data.select(
+        "local_authority_key",
+        *[pl.lit(v, dtype=pl.Categorical).alias(k) for k, v in cols.items()],
+        pl.col("period").cast(pl.Categorical),
+        "value",
+    )
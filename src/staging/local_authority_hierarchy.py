@@ -5,6 +5,7 @@ from loguru import logger
 
 from . import schema
 from pipeline.registry import register_staging_pipeline
+from utils import gss
 
 
 hash = "d91d0f3f36a6fedbaaf44d7a482f60a91a25ff698701d6ac44728359a9378428"
@@ -23,4 +24,7 @@ def stage(source: Path | str) -> pl.DataFrame:
             "country_code",
             "country_name",
         ],
+    ).with_columns(
+        gss.encode_expr(pl.col(f"{area}_code")).alias(f"{area}_key")
+        for area in ["local_authority", "region", "country"]
     )
@@ -1,31 +1,38 @@
 """src/staging/schema.py"""
 
+import polars as pl
 from pandera import polars as pa
 
 
+# Fact labels repeat on every row, so they are dictionary-encoded categoricals
+# backed by polars' global string cache. LAs are identified by the integer key
+# of their GSS code (see `utils.gss`), which the hierarchy maps back to codes.
 Fact = pa.DataFrameSchema(
     {
-        "local_authority_code": pa.Column(str),
-        "metric_group": pa.Column(str),
-        "metric": pa.Column(str),
-        "code": pa.Column(str),
-        "unit": pa.Column(str),
-        "source": pa.Column(str),
-        "period": pa.Column(str),
+        "local_authority_key": pa.Column(pl.UInt32),
+        "metric_group": pa.Column(pl.Categorical),
+        "metric": pa.Column(pl.Categorical),
+        "code": pa.Column(pl.Categorical),
+        "unit": pa.Column(pl.Categorical),
+        "source": pa.Column(pl.Categorical),
+        "period": pa.Column(pl.Categorical),
         "value": pa.Column(float),
     },
     strict=True,
     coerce=True,
-    unique=["local_authority_code", "metric", "period"],
+    unique=["local_authority_key", "metric", "period"],
 )
 
 
 LocalAuthorityHierarchy = pa.DataFrameSchema(
     {
+        "local_authority_key": pa.Column(pl.UInt32, unique=True),
         "local_authority_code": pa.Column(str, unique=True),
         "local_authority_name": pa.Column(str),
+        "region_key": pa.Column(pl.UInt32),
         "region_name": pa.Column(str),
         "region_code": pa.Column(str),
+        "country_key": pa.Column(pl.UInt32),
         "country_code": pa.Column(str),
         "country_name": pa.Column(str),
     },
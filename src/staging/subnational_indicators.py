@@ -1,8 +1,8 @@
 from pathlib import Path
 
 import polars as pl
-from polars import selectors as cs
 
+from . import engine
 from . import schema
 from pipeline.registry import register_staging_pipeline
 
@@ -102,47 +102,17 @@ sheet_metric = {
         "unit": "years",
     },
 }
+spec = engine.WorkbookSpec(
+    metric_group=metric_group,
+    sheet_metric=sheet_metric,
+    local_authority_col="Area code",
+    read_options={"header_row": 5},
+    layout="long",
+)
 
 
-@register_staging_pipeline(hash, schema)
+@register_staging_pipeline(
+    hash, schema, parts_fn=engine.parts(spec), preflight_fn=engine.preflight(spec)
+)
 def stage(source: Path | str) -> pl.DataFrame:
-    source_path = Path(source)
-    staged = []
-    for sheet_name, metric_info in sheet_metric.items():
-        data = load(source, sheet_name)
-        cleansed = clean(data)
-        annotated = annotate(
-            cleansed,
-            metric_group=metric_group,
-            **metric_info,
-            source=source_path.name,
-        )
-        staged.append(annotated)
-
-    return pl.concat(staged)
-
-
-def load(source: Path | str, sheet_name: str) -> pl.DataFrame:
-    return pl.read_excel(source, sheet_name=sheet_name, read_options={"header_row": 5})
-
-
-def clean(data: pl.DataFrame) -> pl.DataFrame:
-    local_auth_col = "Area code"
-    return (
-        data.filter(pl.col(local_auth_col).str.extract(r"^(\w)").is_in(["E", "W"]))
-        .select(
-            pl.col(local_auth_col).alias("local_authority_code"),
-            cs.matches("Period").str.extract(r"^(\d{4})").alias("period"),
-            cs.starts_with("Value").alias("value").cast(pl.Float64, strict=False),
-        )
-        .drop_nulls()
-    )
-
-
-def annotate(data, **cols: str):
-    return data.select(
-        "local_authority_code",
-        *[pl.lit(v).alias(k) for k, v in cols.items()],
-        "period",
-        "value",
-    )
+    return engine.stage(source, spec)
@@ -8,6 +8,8 @@ import dotenv
 class Env(NamedTuple):
     raw_data: str
     staged_data: str
+    warehouse: str = "warehouse.duckdb"
+    exports: str = "exports"
 
 
 def create_env() -> Env:
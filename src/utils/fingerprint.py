@@ -0,0 +1,147 @@
+"""fingerprint.py"""
+
+import json
+import os
+import socket
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from typing import NamedTuple
+
+from . import file_handler as fh
+
+
+LOCK_SUFFIX = ".lock"
+# A save takes milliseconds, so a lock this old was left by a crashed process.
+LOCK_STALE_SECONDS = 60.0
+LOCK_POLL_SECONDS = 0.05
+
+
+class Fingerprint(NamedTuple):
+    size: int
+    mtime_ns: int
+    inode: int
+
+    @classmethod
+    def of(cls, path: Path | str) -> "Fingerprint":
+        stat = os.stat(path)
+        return cls(stat.st_size, stat.st_mtime_ns, stat.st_ino)
+
+
+class FingerprintCache:
+    """
+    Persistent map of `(path, size, mtime_ns, inode)` to a file's `sha256`.
+
+    A file whose stat fingerprint matches its cached entry is assumed to be
+    unchanged, so its digest is returned without reading the file. Set
+    `verify` to ignore cached digests and re-hash every file.
+    """
+
+    def __init__(self, path: Path | str, verify: bool = False):
+        self.path = Path(path)
+        self.verify = verify
+        self.entries: dict[str, tuple[Fingerprint, str]] = {}
+        self.recorded: dict[str, tuple[Fingerprint, str]] = {}
+        if self.path.exists():
+            self.entries = load_entries(self.path)
+
+    def lookup(self, file_path: Path | str) -> str | None:
+        """Return the cached digest of `file_path`, or `None` if stale."""
+        if self.verify:
+            return None
+        key = cache_key(file_path)
+        if key not in self.entries:
+            return None
+        fingerprint, file_hash = self.entries[key]
+        return file_hash if fingerprint == Fingerprint.of(file_path) else None
+
+    def hash_file(self, file_path: Path | str) -> str:
+        """Return the `sha256` of `file_path`, reading it only on a cache miss."""
+        if file_hash := self.lookup(file_path):
+            return file_hash
+        fingerprint = Fingerprint.of(file_path)
+        file_hash = fh.hash_file(file_path)
+        self.update({cache_key(file_path): (fingerprint, file_hash)})
+        return file_hash
+
+    def update(self, entries: dict[str, tuple[Fingerprint, str]]) -> None:
+        self.entries.update(entries)
+        self.recorded.update(entries)
+
+    def save(self) -> None:
+        """
+        Atomically write the cache back to `path` if anything was recorded.
+
+        Entries saved meanwhile by other processes sharing `path` are merged
+        in first, under a lock file, so concurrent workers don't drop each
+        other's digests.
+        """
+        if not self.recorded:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with locked(self.path):
+            if self.path.exists():
+                self.entries = {**load_entries(self.path), **self.recorded}
+            tmp_path = self.path.with_name(
+                f".{self.path.name}.{socket.gethostname()}.{os.getpid()}.tmp"
+            )
+            with tmp_path.open("w") as f:
+                json.dump(
+                    {
+                        key: {**fingerprint._asdict(), "sha256": file_hash}
+                        for key, (fingerprint, file_hash) in sorted(
+                            self.entries.items()
+                        )
+                    },
+                    f,
+                    indent=2,
+                )
+            os.replace(tmp_path, self.path)
+        self.recorded.clear()
+
+
+@contextmanager
+def locked(path: Path) -> Iterator[None]:
+    """
+    Hold the lock file beside `path` for the duration, waiting until it is free.
+
+    The lock is created with `O_EXCL`, as stage claims are, so it serialises
+    processes on any host sharing `path`. One left by a crashed process is
+    removed once it is `LOCK_STALE_SECONDS` old.
+    """
+    lock_path = path.with_name(path.name + LOCK_SUFFIX)
+    while True:
+        try:
+            os.close(os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644))
+            break
+        except FileExistsError:
+            try:
+                age = time.time() - lock_path.stat().st_mtime
+            except FileNotFoundError:
+                continue
+            if age > LOCK_STALE_SECONDS:
+                lock_path.unlink(missing_ok=True)
+            else:
+                time.sleep(LOCK_POLL_SECONDS)
+    try:
+        yield
+    finally:
+        lock_path.unlink(missing_ok=True)
+
+
+def cache_key(file_path: Path | str) -> str:
+    return str(Path(file_path).resolve())
+
+
+def load_entries(path: Path) -> dict[str, tuple[Fingerprint, str]]:
+    with path.open() as f:
+        data = json.load(f)
+
+    return {
+        key: (
+            Fingerprint(entry["size"], entry["mtime_ns"], entry["inode"]),
+            entry["sha256"],
+        )
+        for key, entry in data.items()
+    }
@@ -0,0 +1,61 @@
+"""gss.py"""
+
+import re
+import string
+
+import polars as pl
+
+
+# GSS codes are one entity letter followed by eight digits, e.g. "E06000001".
+GSS_CODE = r"^[A-Z]\d{8}$"
+DIGITS = 10**8
+LETTERS = list(string.ascii_uppercase)
+
+
+def encode(code: str) -> int:
+    """
+    Return the integer key of GSS `code`.
+
+    The key packs the letter and the digits as `letter * 10**8 + digits`, so
+    it fits in a `UInt32`, is the same in every process and staged file, and
+    sorts in the same order as the codes. Raises `ValueError` for a code that
+    is not a GSS code.
+    """
+    if not re.match(GSS_CODE, code):
+        raise ValueError(f"'{code}' is not a GSS code.")
+    return LETTERS.index(code[0]) * DIGITS + int(code[1:])
+
+
+def decode(key: int) -> str:
+    """Return the GSS code whose key is `key`."""
+    letter, digits = divmod(key, DIGITS)
+    return f"{LETTERS[letter]}{digits:08d}"
+
+
+def encode_expr(code: pl.Expr) -> pl.Expr:
+    """Polars version of `encode`; codes that are not GSS codes become null."""
+    code = code.cast(pl.String)
+    letter = code.str.head(1).replace_strict(
+        LETTERS, range(len(LETTERS)), default=None, return_dtype=pl.Int64
+    )
+    return (
+        pl.when(code.str.contains(GSS_CODE))
+        .then(letter * DIGITS + code.str.slice(1).cast(pl.Int64, strict=False))
+        .cast(pl.UInt32)
+    )
+
+
+def decode_expr(key: pl.Expr) -> pl.Expr:
+    """Polars version of `decode`."""
+    letter = (key // DIGITS).replace_strict(
+        range(len(LETTERS)), LETTERS, return_dtype=pl.String
+    )
+    return pl.concat_str(letter, (key % DIGITS).cast(pl.String).str.zfill(8))
+
+
+def decode_sql(key: str) -> str:
+    """Return a DuckDB expression that decodes the key column `key`."""
+    return (
+        f"chr(CAST({ord('A')} + {key} // {DIGITS} AS INTEGER)) "
+        f"|| lpad(CAST({key} % {DIGITS} AS VARCHAR), 8, '0')"
+    )
@@ -0,0 +1,118 @@
+"""profiler.py"""
+
+from __future__ import annotations
+
+import cProfile
+import csv
+import io
+import pstats
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import polars as pl
+
+
+STATS_NAME = "pipeline.prof"
+STATS_TEXT_NAME = "pipeline.txt"
+VALIDATION_NAME = "validation.csv"
+# Functions listed in the text report, by cumulative and by own time.
+TOP_FUNCTIONS = 40
+
+
+class Profiler:
+    """
+    Collects the profiling reports of one staged file in `report_dir`.
+
+    - `pipeline.prof`/`pipeline.txt`: a cProfile of the staging pipeline, as
+      pstats data and as its top functions by cumulative and by own time.
+    - `plan-NN.txt`/`plan-NN.csv`: the optimised polars plan of each
+      `clean`/`transform` chain collected through `collect`, and polars' own
+      per-node timings (in microseconds) for it.
+    - `validation.csv`: seconds spent on each schema rule, summed over parts.
+    """
+
+    def __init__(self, report_dir: Path):
+        self.report_dir = report_dir
+        self.profile = cProfile.Profile()
+        self.n_plans = 0
+        self.validation_seconds: dict[str, float] = {}
+
+    @contextmanager
+    def pipeline(self) -> Iterator[None]:
+        # May be entered once per streamed part; the profile accumulates.
+        self.profile.enable()
+        try:
+            yield
+        finally:
+            self.profile.disable()
+
+    def collect(
+        self, plan: pl.LazyFrame, label: str, engine: pl.EngineType = "auto"
+    ) -> pl.DataFrame:
+        """Collect `plan` under polars' profiler, writing its plan and timings."""
+        name = f"plan-{self.n_plans:02d}"
+        self.n_plans += 1
+        (self.report_dir / f"{name}.txt").write_text(
+            f"# {label}\n{plan.explain(optimized=True)}\n"
+        )
+        data, timings = plan.profile(engine=engine)
+        timings.write_csv(self.report_dir / f"{name}.csv")
+        return data
+
+    def add_validation(self, rule_seconds: dict[str, float]) -> None:
+        for rule, seconds in rule_seconds.items():
+            self.validation_seconds[rule] = (
+                self.validation_seconds.get(rule, 0.0) + seconds
+            )
+
+    def write(self) -> None:
+        self.profile.dump_stats(self.report_dir / STATS_NAME)
+        report = io.StringIO()
+        stats = pstats.Stats(self.profile, stream=report).strip_dirs()
+        for sort_key in ("cumulative", "tottime"):
+            stats.sort_stats(sort_key).print_stats(TOP_FUNCTIONS)
+        (self.report_dir / STATS_TEXT_NAME).write_text(report.getvalue())
+
+        if self.validation_seconds:
+            with (self.report_dir / VALIDATION_NAME).open("w", newline="") as f:
+                writer = csv.writer(f)
+                writer.writerow(["rule", "seconds"])
+                for rule, seconds in self.validation_seconds.items():
+                    writer.writerow([rule, f"{seconds:.6f}"])
+
+
+active_profiler: ContextVar[Profiler | None] = ContextVar(
+    "active_profiler", default=None
+)
+
+
+@contextmanager
+def use(profile_dir: Path | str | None, file_hash: str) -> Iterator[Profiler | None]:
+    """
+    Profile staging the file with `file_hash` into `profile_dir/<file_hash>/`.
+
+    Staging functions only receive the file path, so `engine` finds the
+    profiler through a context variable, as it does the sheet cache. Yields
+    `None`, and profiles nothing, if `profile_dir` is `None`. Reports from an
+    earlier run into the same directory are replaced.
+    """
+    if profile_dir is None:
+        yield None
+        return
+
+    report_dir = Path(profile_dir) / file_hash
+    report_dir.mkdir(parents=True, exist_ok=True)
+    for stale in report_dir.iterdir():
+        stale.unlink()
+
+    profiler = Profiler(report_dir)
+    token = active_profiler.set(profiler)
+    try:
+        yield profiler
+    finally:
+        active_profiler.reset(token)
+        profiler.write()
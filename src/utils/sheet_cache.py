@@ -0,0 +1,157 @@
+"""sheet_cache.py"""
+
+from __future__ import annotations
+
+import hashlib
+import inspect
+import json
+import os
+import threading
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, NamedTuple
+
+if TYPE_CHECKING:
+    import polars as pl
+
+
+DEFAULT_MAX_MB = 1024
+SUFFIX = ".arrow"
+# Bump when the cached frames change shape, e.g. if `workbook.drop_empty` does.
+FORMAT_VERSION = 1
+
+
+class SheetCache:
+    """
+    Parsed workbook sheets as uncompressed Arrow IPC files in `cache_dir`.
+
+    Each entry is keyed by the workbook's `sha256`, the sheet name and the
+    reader options, so a cached sheet is reused until the file's bytes or the
+    way it is read change. Entries are memory-mapped on read. Once the cache
+    holds more than `max_mb`, the least recently used entries are evicted.
+    """
+
+    def __init__(self, cache_dir: Path | str, max_mb: int = DEFAULT_MAX_MB):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_mb * 2**20
+
+    def path(
+        self, file_hash: str, sheet_name: str, read_options: dict[str, Any]
+    ) -> Path | None:
+        """Return the entry path for a sheet, or `None` if it can't be keyed."""
+        options = options_key(read_options)
+        if options is None:
+            return None
+        key = json.dumps([FORMAT_VERSION, file_hash, sheet_name, options])
+        return self.cache_dir / f"{hashlib.sha256(key.encode()).hexdigest()}{SUFFIX}"
+
+    def get(
+        self, file_hash: str, sheet_name: str, read_options: dict[str, Any]
+    ) -> pl.DataFrame | None:
+        import polars as pl
+
+        path = self.path(file_hash, sheet_name, read_options)
+        if path is None or not path.exists():
+            return None
+        # The mtime records the last use, for eviction.
+        os.utime(path)
+        return pl.read_ipc(path, memory_map=True)
+
+    def put(
+        self,
+        file_hash: str,
+        sheet_name: str,
+        read_options: dict[str, Any],
+        data: pl.DataFrame,
+    ) -> None:
+        path = self.path(file_hash, sheet_name, read_options)
+        if path is None:
+            return
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(
+            f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp"
+        )
+        data.write_ipc(tmp_path, compression="uncompressed")
+        os.replace(tmp_path, path)
+
+    def evict(self) -> int:
+        """Delete least recently used entries until under `max_mb`; return bytes freed."""
+        if not self.cache_dir.exists():
+            return 0
+        entries = []
+        with os.scandir(self.cache_dir) as it:
+            for entry in it:
+                if entry.name.endswith(SUFFIX) and not entry.name.startswith("."):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+
+        total = sum(size for _, size, _ in entries)
+        freed = 0
+        for _, size, path in sorted(entries):
+            if total - freed <= self.max_bytes:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                continue
+            freed += size
+
+        return freed
+
+
+class BoundCache(NamedTuple):
+    """A `SheetCache` bound to the workbook currently being staged."""
+
+    cache: SheetCache
+    file_hash: str
+
+    def contains(self, sheet_name: str, read_options: dict[str, Any]) -> bool:
+        path = self.cache.path(self.file_hash, sheet_name, read_options)
+        return path is not None and path.exists()
+
+    def get(self, sheet_name: str, read_options: dict[str, Any]) -> pl.DataFrame | None:
+        return self.cache.get(self.file_hash, sheet_name, read_options)
+
+    def put(
+        self, sheet_name: str, read_options: dict[str, Any], data: pl.DataFrame
+    ) -> None:
+        self.cache.put(self.file_hash, sheet_name, read_options, data)
+
+
+active_cache: ContextVar[BoundCache | None] = ContextVar("active_cache", default=None)
+
+
+@contextmanager
+def use(cache: SheetCache | None, file_hash: str) -> Iterator[None]:
+    """
+    Serve `workbook` sheet reads of the file with `file_hash` from `cache`.
+
+    Staging functions only receive the file path, so the cache and the hash
+    the runner has already computed are passed through a context variable.
+    Entries over the size limit are evicted on exit.
+    """
+    if cache is None:
+        yield
+        return
+
+    token = active_cache.set(BoundCache(cache, file_hash))
+    try:
+        yield
+    finally:
+        active_cache.reset(token)
+        cache.evict()
+
+
+def options_key(read_options: dict[str, Any]) -> str | None:
+    """
+    Return a stable key for `read_options`, or `None` if there is none.
+
+    Values are keyed on their `repr`, so a `use_columns` predicate must be an
+    object with a stable `repr` (e.g. `engine.UsedColumns`); a plain function
+    or lambda can't be keyed and its sheets are not cached.
+    """
+    if any(inspect.isfunction(value) for value in read_options.values()):
+        return None
+    return repr(sorted(read_options.items()))
@@ -0,0 +1,143 @@
+"""workbook.py"""
+
+import os
+import re
+import threading
+from collections.abc import Callable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any
+
+import fastexcel
+import polars as pl
+
+from . import sheet_cache
+
+
+ReadOptions = dict[str, Any]
+
+MAX_SHEET_WORKERS = 8
+
+UNNAMED_COLUMN = re.compile(r"(_duplicated_|__UNNAMED__)\d+$")
+
+
+def read_sheets(
+    source: Path | str | bytes, sheets: dict[str, ReadOptions]
+) -> dict[str, pl.DataFrame]:
+    """
+    Open the workbook at `source` once and read every sheet in `sheets`.
+
+    Each sheet is read with its own fastexcel `load_sheet` options (e.g.
+    `header_row`, `n_rows`) and cleaned the same way as `pl.read_excel`.
+    """
+    reader = SheetReader(source)
+    return {
+        sheet_name: reader.read(sheet_name, read_options)
+        for sheet_name, read_options in sheets.items()
+    }
+
+
+def iter_sheets(
+    source: Path | str | bytes, sheets: dict[str, ReadOptions]
+) -> Iterator[tuple[str, pl.DataFrame]]:
+    """Read the sheets in `sheets` one at a time, yielding `(sheet_name, data)`."""
+    reader = SheetReader(source)
+    for sheet_name, read_options in sheets.items():
+        yield sheet_name, reader.read(sheet_name, read_options)
+
+
+def map_sheets[T](
+    source: Path | str | bytes,
+    sheets: dict[str, ReadOptions],
+    func: Callable[[str, pl.DataFrame], T],
+    max_workers: int | None = None,
+) -> list[T]:
+    """
+    Read every sheet in `sheets` and apply `func(sheet_name, data)` to it.
+
+    Sheets are read and processed on a bounded thread pool; fastexcel and
+    polars release the GIL, so wide workbooks use several cores. A fastexcel
+    reader cannot be shared between threads, so the workbook bytes are read
+    once and each worker opens its own reader over them. Results are returned
+    in the order of `sheets`.
+    """
+    cache = sheet_cache.active_cache.get()
+    n_parsed = sum(
+        cache is None or not cache.contains(sheet_name, read_options)
+        for sheet_name, read_options in sheets.items()
+    )
+    if max_workers is None:
+        max_workers = min(n_parsed, os.process_cpu_count() or 1, MAX_SHEET_WORKERS)
+
+    if max_workers <= 1:
+        reader = SheetReader(source, cache)
+        return [
+            func(sheet_name, reader.read(sheet_name, read_options))
+            for sheet_name, read_options in sheets.items()
+        ]
+
+    content = source if isinstance(source, bytes) else Path(source).read_bytes()
+    local = threading.local()
+
+    def read_and_apply(item: tuple[str, ReadOptions]) -> T:
+        sheet_name, read_options = item
+        if not hasattr(local, "reader"):
+            local.reader = SheetReader(content, cache)
+        return func(sheet_name, local.reader.read(sheet_name, read_options))
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(read_and_apply, sheets.items()))
+
+
+class SheetReader:
+    """
+    Reads sheets from one workbook, through the active sheet cache if any.
+
+    The workbook is only opened on a cache miss, so a fully cached workbook
+    is never parsed.
+    """
+
+    def __init__(
+        self,
+        source: Path | str | bytes,
+        cache: sheet_cache.BoundCache | None = None,
+    ):
+        self.source = source
+        self.cache = cache if cache is not None else sheet_cache.active_cache.get()
+        self.reader: fastexcel.ExcelReader | None = None
+
+    def read(self, sheet_name: str, read_options: ReadOptions) -> pl.DataFrame:
+        if self.cache is not None:
+            data = self.cache.get(sheet_name, read_options)
+            if data is not None:
+                return data
+        if self.reader is None:
+            self.reader = fastexcel.read_excel(self.source)
+        data = read_sheet(self.reader, sheet_name, read_options)
+        if self.cache is not None:
+            self.cache.put(sheet_name, read_options, data)
+        return data
+
+
+def read_sheet(
+    reader: fastexcel.ExcelReader, sheet_name: str, read_options: ReadOptions
+) -> pl.DataFrame:
+    return drop_empty(reader.load_sheet(sheet_name, **read_options).to_polars())
+
+
+def drop_empty(data: pl.DataFrame) -> pl.DataFrame:
+    """Drop empty unnamed columns and all-null rows, as `pl.read_excel` does."""
+    empty_cols = [
+        col.name
+        for col in data.iter_columns()
+        if (col.name == "" or UNNAMED_COLUMN.match(col.name))
+        and (
+            col.dtype == pl.Null
+            or col.null_count() == data.height
+            or (
+                col.dtype.is_numeric()
+                and col.replace(0, None).null_count() == data.height
+            )
+        )
+    ]
+    return data.drop(empty_cols).filter(~pl.all_horizontal(pl.all().is_null()))
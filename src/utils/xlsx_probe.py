@@ -0,0 +1,171 @@
+"""xlsx_probe.py"""
+
+import io
+import re
+import zipfile
+from collections.abc import Iterator
+from pathlib import Path, PurePosixPath
+from typing import Self
+from xml.etree import ElementTree
+
+
+MAIN_NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+REL_ID = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}id"
+PACKAGE_REL = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+CELL_REF = re.compile(r"^([A-Z]+)(\d+)$")
+
+Row = dict[int, str]
+
+# Formats stored as SpreadsheetML in a zip; fastexcel reads others too.
+SUFFIXES = frozenset({".xlsx", ".xlsm"})
+
+
+class WorkbookProbe:
+    """
+    Read sheet names and sheet headers straight from xlsx XML.
+
+    Only the workbook index and the start of each worksheet are parsed, and
+    shared strings are parsed only as far as the probed cells need, so a
+    probe costs milliseconds however large the sheets are. Cell values are
+    returned as text, keyed by 0-based column index.
+    """
+
+    def __init__(self, source: Path | str | bytes):
+        self.zf = zipfile.ZipFile(
+            io.BytesIO(source) if isinstance(source, bytes) else source
+        )
+        self.sheet_paths = read_sheet_paths(self.zf)
+        self.shared_strings: list[str] = []
+        self.shared_string_iter: Iterator[str] | None = None
+
+    @property
+    def sheet_names(self) -> list[str]:
+        return list(self.sheet_paths)
+
+    def header(self, sheet_name: str, header_row: int = 0) -> tuple[Row, int]:
+        """
+        Return the row fastexcel reads as the header and its first column.
+
+        As in fastexcel, `header_row` 0 is the first row with a value, and any
+        other `header_row` is that row of the sheet, even if it is empty.
+        Columns are numbered from the first column with a value in the header
+        or any row below it, found from the cells themselves rather than the
+        sheet's `<dimension>`, which may be stale or count cells with only a
+        style. The scan stops at the first value in column A, which most
+        sheets have within a few rows of the header.
+        """
+        header: Row | None = None
+        first_col = None
+        row_index = -1
+        with self.zf.open(self.sheet_paths[sheet_name]) as f:
+            for _, elem in ElementTree.iterparse(f):
+                if elem.tag != f"{MAIN_NS}row":
+                    continue
+                # `r` is optional; without it rows follow on from the last.
+                row_index = int(elem.get("r", row_index + 2)) - 1
+                cells = [
+                    (col, cell) for col, cell in row_cells(elem) if has_value(cell)
+                ]
+                if header is None and header_row > 0 and row_index > header_row:
+                    header = {}
+                if header is None and (
+                    row_index == header_row or (header_row == 0 and cells)
+                ):
+                    header = {col: self.cell_text(cell) or "" for col, cell in cells}
+                if header is not None and cells:
+                    row_first_col = min(col for col, _ in cells)
+                    if first_col is None or row_first_col < first_col:
+                        first_col = row_first_col
+                elem.clear()
+                if first_col == 0:
+                    break
+
+        return header or {}, 0 if first_col is None else first_col
+
+    def cell_text(self, cell: ElementTree.Element) -> str | None:
+        cell_type = cell.get("t", "n")
+        if cell_type == "inlineStr":
+            return "".join(t.text or "" for t in cell.iter(f"{MAIN_NS}t"))
+        value = cell.findtext(f"{MAIN_NS}v")
+        if value is None:
+            return None
+        if cell_type == "s":
+            return self.shared_string(int(value))
+        if cell_type == "n":
+            number = float(value)
+            # fastexcel names a column headed 2010.0 "2010".
+            return str(int(number)) if number.is_integer() else value
+        return value
+
+    def shared_string(self, index: int) -> str:
+        if self.shared_string_iter is None:
+            self.shared_string_iter = iter_shared_strings(self.zf)
+        while len(self.shared_strings) <= index:
+            self.shared_strings.append(next(self.shared_string_iter))
+        return self.shared_strings[index]
+
+    def close(self) -> None:
+        self.zf.close()
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def read_sheet_paths(zf: zipfile.ZipFile) -> dict[str, str]:
+    """Map each sheet name to its worksheet part, in workbook order."""
+    targets = {
+        rel.get("Id"): rel.get("Target")
+        for rel in ElementTree.fromstring(zf.read("xl/_rels/workbook.xml.rels")).iter(
+            f"{PACKAGE_REL}Relationship"
+        )
+    }
+    sheet_paths = {}
+    workbook = ElementTree.fromstring(zf.read("xl/workbook.xml"))
+    for sheet in workbook.iter(f"{MAIN_NS}sheet"):
+        target = targets[sheet.get(REL_ID)]
+        if target.startswith("/"):
+            sheet_paths[sheet.get("name")] = target.lstrip("/")
+        else:
+            sheet_paths[sheet.get("name")] = str(PurePosixPath("xl") / target)
+
+    return sheet_paths
+
+
+def iter_shared_strings(zf: zipfile.ZipFile) -> Iterator[str]:
+    if "xl/sharedStrings.xml" not in zf.namelist():
+        return
+    with zf.open("xl/sharedStrings.xml") as f:
+        for _, elem in ElementTree.iterparse(f):
+            if elem.tag == f"{MAIN_NS}si":
+                # Plain text, or rich text split into runs; phonetic hints
+                # (`rPh`) are not part of the value.
+                text = elem.findtext(f"{MAIN_NS}t")
+                if text is None:
+                    text = "".join(
+                        t.text or "" for t in elem.iterfind(f"{MAIN_NS}r/{MAIN_NS}t")
+                    )
+                yield text
+                elem.clear()
+
+
+def row_cells(row: ElementTree.Element) -> Iterator[tuple[int, ElementTree.Element]]:
+    """Yield each cell in `row` with its 0-based column index."""
+    for col_index, cell in enumerate(row.iter(f"{MAIN_NS}c")):
+        # `r` is optional; without it cells follow on from the last.
+        ref = CELL_REF.match(cell.get("r", ""))
+        yield (col_index if ref is None else column_index(ref.group(1))), cell
+
+
+def has_value(cell: ElementTree.Element) -> bool:
+    # A cell with only a style, as formatting leaves behind, has neither.
+    return cell.find(f"{MAIN_NS}v") is not None or cell.find(f"{MAIN_NS}is") is not None
+
+
+def column_index(letters: str) -> int:
+    index = 0
+    for letter in letters:
+        index = index * 26 + ord(letter) - ord("A") + 1
+    return index - 1
@@ -0,0 +1,168 @@
+"""warehouse/derived.py"""
+
+from pathlib import Path
+
+import duckdb
+from loguru import logger
+
+
+DERIVED_TABLE = "fact_derived"
+STATE_TABLE = "fact_derived_state"
+
+# Each feature is a SQL expression over one LA's series for one code, with
+# `year` parsed from `period` and the previous point of the series in
+# `previous_year`/`previous_value`. Ranks are 1 for the highest value.
+FEATURE_SQL: dict[str, str] = {
+    "yoy_change": "CASE WHEN previous_year = year - 1 THEN value - previous_value END",
+    "yoy_pct_change": (
+        "CASE WHEN previous_year = year - 1 AND previous_value <> 0 "
+        "THEN (value - previous_value) / abs(previous_value) * 100 END"
+    ),
+    "rolling_mean_3": (
+        "CASE WHEN count(value) OVER trailing_3 = 3 THEN avg(value) OVER trailing_3 END"
+    ),
+    "national_rank": (
+        "CASE WHEN value IS NOT NULL THEN rank() OVER ("
+        "PARTITION BY code, year, value IS NULL ORDER BY value DESC) END"
+    ),
+    "region_rank": (
+        "CASE WHEN value IS NOT NULL AND region_key IS NOT NULL THEN rank() OVER ("
+        "PARTITION BY code, year, region_key, value IS NULL ORDER BY value DESC) END"
+    ),
+}
+DEFAULT_FEATURES = list(FEATURE_SQL)
+
+DERIVED_DDL = f"""
+CREATE TABLE IF NOT EXISTS {DERIVED_TABLE} (
+    code VARCHAR NOT NULL,
+    local_authority_key UINTEGER NOT NULL,
+    period VARCHAR NOT NULL,
+    feature VARCHAR NOT NULL,
+    value DOUBLE NOT NULL
+)
+"""
+# What each code's features were computed from, to find the codes to refresh.
+STATE_DDL = f"""
+CREATE TABLE IF NOT EXISTS {STATE_TABLE} (
+    code VARCHAR PRIMARY KEY,
+    row_count BIGINT NOT NULL,
+    checksum UBIGINT NOT NULL,
+    features VARCHAR NOT NULL
+)
+"""
+# Region ranks depend on the hierarchy, so an LA changing region changes the
+# checksum of every code it has facts for.
+CURRENT_STATE_SQL = """
+CREATE OR REPLACE TEMP TABLE derived_current AS
+SELECT
+    f.code,
+    count(*) AS row_count,
+    bit_xor(hash(f.local_authority_key, f.period, f.value, l.region_key)) AS checksum,
+    $features AS features
+FROM fact f
+LEFT JOIN local_authority l USING (local_authority_key)
+GROUP BY f.code
+"""
+STALE_CODES_SQL = f"""
+SELECT coalesce(c.code, s.code)
+FROM derived_current c
+FULL JOIN {STATE_TABLE} s USING (code)
+WHERE c.code IS NULL OR s.code IS NULL
+    OR (c.row_count, c.checksum, c.features)
+        IS DISTINCT FROM (s.row_count, s.checksum, s.features)
+"""
+DERIVE_SQL = """
+INSERT INTO {table}
+WITH series AS (
+    SELECT
+        f.code,
+        f.local_authority_key,
+        f.period,
+        TRY_CAST(f.period AS INTEGER) AS year,
+        f.value,
+        l.region_key
+    FROM fact f
+    LEFT JOIN local_authority l USING (local_authority_key)
+    WHERE f.code IN (SELECT unnest($codes::VARCHAR[]))
+        AND TRY_CAST(f.period AS INTEGER) IS NOT NULL
+),
+lagged AS (
+    SELECT
+        *,
+        lag(year) OVER by_year AS previous_year,
+        lag(value) OVER by_year AS previous_value
+    FROM series
+    WINDOW by_year AS (PARTITION BY code, local_authority_key ORDER BY year)
+),
+features AS (
+    SELECT code, local_authority_key, period, {features}
+    FROM lagged
+    WINDOW trailing_3 AS (
+        PARTITION BY code, local_authority_key
+        ORDER BY year RANGE BETWEEN 2 PRECEDING AND CURRENT ROW
+    )
+)
+UNPIVOT features ON {names} INTO NAME feature VALUE value
+"""
+
+
+def refresh_derived(
+    database: Path | str, features: list[str] = DEFAULT_FEATURES
+) -> tuple[int, int]:
+    """
+    Materialise the derived `features` of every fact code in `fact_derived`.
+
+    Features are computed for all LAs, periods and codes in one windowed
+    pass, with `period` parsed to a year once. Only codes whose facts (or
+    LAs' regions, or the feature set) have changed since the last refresh
+    are recomputed; the rest are left as they are. Periods that are not
+    years are skipped. Returns (codes refreshed, rows written).
+    """
+    unknown = [name for name in features if name not in FEATURE_SQL]
+    if unknown:
+        raise ValueError(f"Unknown derived features: {unknown}")
+
+    with duckdb.connect(str(database)) as con:
+        con.execute(DERIVED_DDL)
+        con.execute(STATE_DDL)
+        con.execute(CURRENT_STATE_SQL, {"features": ",".join(features)})
+        codes = [row[0] for row in con.execute(STALE_CODES_SQL).fetchall()]
+        if not codes:
+            logger.info(f"'{DERIVED_TABLE}' is up to date.")
+            return 0, 0
+
+        con.begin()
+        con.execute(
+            f"DELETE FROM {DERIVED_TABLE} WHERE code IN (SELECT unnest($codes))",
+            {"codes": codes},
+        )
+        con.execute(
+            DERIVE_SQL.format(
+                table=DERIVED_TABLE,
+                features=", ".join(
+                    f"CAST({FEATURE_SQL[name]} AS DOUBLE) AS {name}"
+                    for name in features
+                ),
+                names=", ".join(features),
+            ),
+            {"codes": codes},
+        )
+        row_count = con.execute(
+            f"SELECT count(*) FROM {DERIVED_TABLE} WHERE code IN (SELECT unnest($codes))",
+            {"codes": codes},
+        ).fetchone()[0]
+        con.execute(
+            f"DELETE FROM {STATE_TABLE} WHERE code IN (SELECT unnest($codes))",
+            {"codes": codes},
+        )
+        con.execute(
+            f"INSERT INTO {STATE_TABLE} SELECT * FROM derived_current "
+            "WHERE code IN (SELECT unnest($codes))",
+            {"codes": codes},
+        )
+        con.commit()
+
+    logger.info(
+        f"Refreshed {len(codes)} codes ({row_count} rows) in '{DERIVED_TABLE}'."
+    )
+    return len(codes), row_count
@@ -0,0 +1,147 @@
+"""warehouse/export.py"""
+
+import json
+from pathlib import Path
+
+import polars as pl
+from loguru import logger
+
+from pipeline import writer
+from utils import gss
+from . import loader
+from .query import HIERARCHY_COLUMNS
+
+
+WIDE_NAME = "fact_wide.arrow"
+MANIFEST_SUFFIX = ".json"
+FRAGMENT_DIR = ".fragments"
+INDEX = ["local_authority_key", "period"]
+# The wide matrix is keyed by GSS code rather than the staged `SORT_KEY`.
+WIDE_KEY = ["local_authority_code", "period"]
+
+
+def export_wide(
+    staged_dir: Path | str, export_dir: Path | str, hierarchy: bool = True
+) -> Path:
+    """
+    Write the staged facts as one wide Arrow IPC matrix in `export_dir`.
+
+    The matrix has one row per LA and period and one `Float64` column per
+    metric `code`, optionally preceded by the LA's hierarchy attributes. It is
+    written uncompressed, so `read_wide` can memory-map it and read columns
+    without copying.
+
+    Regeneration is incremental: each staged fact file is pivoted once into a
+    cached fragment keyed by its hash, and the matrix is only rebuilt (by
+    merging the fragments) when the set of staged inputs has changed. Where
+    staged editions overlap, the most recently staged value of each code, LA
+    and period is used, as in the loader.
+    """
+    staged_dir_path = Path(staged_dir)
+    export_dir_path = Path(export_dir)
+    wide_path = export_dir_path / WIDE_NAME
+    manifest_path = wide_path.with_name(wide_path.name + MANIFEST_SUFFIX)
+
+    fact_files = writer.oldest_first(staged_files(staged_dir_path, loader.FACT))
+    hierarchy_files = writer.oldest_first(
+        staged_files(staged_dir_path, loader.LOCAL_AUTHORITY)
+    )
+    manifest = {
+        "index": INDEX,
+        "facts": [path.name for path in fact_files],
+        "hierarchy": [path.name for path in hierarchy_files] if hierarchy else None,
+    }
+    if wide_path.exists() and read_manifest(manifest_path) == manifest:
+        logger.info(f"'{wide_path}' is up to date.")
+        return wide_path
+
+    fragment_dir = export_dir_path / FRAGMENT_DIR
+    fragments = {path.stem: fragment(path, fragment_dir) for path in fact_files}
+    for stale in fragment_dir.glob("*.arrow"):
+        if stale.stem not in fragments:
+            stale.unlink()
+
+    # Unpivoted oldest edition first, so the newest value of each code, LA and
+    # period wins, as in the loader. Nulls are gaps in a fragment's pivot, not
+    # staged values, so they never hide an older edition's value.
+    facts = [
+        pl.scan_ipc(fragments[path.stem], memory_map=True)
+        .unpivot(index=INDEX, variable_name="code")
+        .drop_nulls("value")
+        .cast({"value": pl.Float64})
+        for path in fact_files
+    ]
+    if facts:
+        wide = (
+            pl.concat(facts)
+            .unique([*INDEX, "code"], keep="last", maintain_order=True)
+            .collect()
+            .pivot(on="code", index=INDEX, values="value")
+            .lazy()
+        )
+    else:
+        wide = pl.LazyFrame(
+            schema={"local_authority_key": pl.UInt32, "period": pl.String}
+        )
+    codes = sorted(col for col in wide.collect_schema() if col not in INDEX)
+
+    attributes = []
+    if hierarchy and hierarchy_files:
+        attributes = HIERARCHY_COLUMNS
+        local_authorities = (
+            pl.concat(writer.scan_staged(path) for path in hierarchy_files)
+            .select("local_authority_key", *HIERARCHY_COLUMNS)
+            .unique("local_authority_key", keep="last", maintain_order=True)
+        )
+        wide = wide.join(local_authorities, on="local_authority_key", how="left")
+
+    wide = wide.select(
+        gss.decode_expr(pl.col("local_authority_key")).alias("local_authority_code"),
+        *attributes,
+        "period",
+        *codes,
+    ).collect()
+    writer.write_staged(wide, wide_path, "ipc", sort_key=WIDE_KEY)
+    manifest_path.write_text(json.dumps(manifest, indent=2))
+    logger.info(f"Exported {wide.height} rows x {len(codes)} codes to '{wide_path}'.")
+
+    return wide_path
+
+
+def read_wide(export_dir: Path | str, columns: list[str] | None = None) -> pl.DataFrame:
+    """Memory-map the wide matrix in `export_dir`, reading only `columns`."""
+    return pl.read_ipc(Path(export_dir) / WIDE_NAME, columns=columns, memory_map=True)
+
+
+def fragment(file_path: Path, fragment_dir: Path) -> Path:
+    """Pivot one staged fact file to wide format, once per file hash."""
+    fragment_path = fragment_dir / f"{file_path.stem}.arrow"
+    # Fragments cached before a change to `INDEX` are rebuilt.
+    if fragment_path.exists() and set(INDEX) <= set(pl.read_ipc_schema(fragment_path)):
+        return fragment_path
+
+    facts = writer.scan_staged(file_path).select(
+        "local_authority_key", pl.col("period", "code").cast(pl.String), "value"
+    )
+    wide = facts.collect().pivot(on="code", index=INDEX, values="value")
+    return writer.write_staged(wide, fragment_path, "ipc")
+
+
+def staged_files(staged_dir: Path, table: loader.Table) -> list[Path]:
+    """Return the staged parquet and IPC files whose columns match `table`."""
+    files = []
+    for output_format in writer.SUFFIXES:
+        for file_path in writer.staged_paths(staged_dir, output_format):
+            if not writer.part_paths(file_path):
+                continue
+            columns = set(writer.scan_staged(file_path).collect_schema())
+            if columns == set(table.schema.columns):
+                files.append(file_path)
+
+    return files
+
+
+def read_manifest(manifest_path: Path) -> dict | None:
+    if not manifest_path.exists():
+        return None
+    return json.loads(manifest_path.read_text())
@@ -0,0 +1,297 @@
+"""warehouse/loader.py"""
+
+from pathlib import Path
+from typing import NamedTuple
+
+import duckdb
+import polars as pl
+from pandera import polars as pa
+
+from pipeline import log
+from pipeline import writer
+from pipeline.outcome import Outcome
+from staging import schema
+
+
+class Table(NamedTuple):
+    name: str
+    schema: pa.DataFrameSchema
+    key: list[str]
+    primary_key: bool = False
+
+
+FACT = Table("fact", schema.Fact, ["code", "local_authority_key", "period"])
+# Also the persisted mapping from LA, region and country keys to GSS codes.
+LOCAL_AUTHORITY = Table(
+    "local_authority",
+    schema.LocalAuthorityHierarchy,
+    ["local_authority_key"],
+    primary_key=True,
+)
+TABLES = [FACT, LOCAL_AUTHORITY]
+
+# One row per revised fact value, with the edition it came from.
+FACT_CHANGE_DDL = """
+CREATE TABLE IF NOT EXISTS fact_change (
+    code VARCHAR NOT NULL,
+    local_authority_key UINTEGER NOT NULL,
+    period VARCHAR NOT NULL,
+    previous_value DOUBLE,
+    value DOUBLE,
+    previous_source_hash VARCHAR NOT NULL,
+    source_hash VARCHAR NOT NULL,
+    source VARCHAR NOT NULL,
+    changed_at TIMESTAMP NOT NULL DEFAULT current_timestamp
+)
+"""
+# Columns whose difference makes a staged fact a revision; a new `source`
+# alone (e.g. a renamed workbook) does not.
+FACT_COMPARED = ["value", "metric_group", "metric", "unit"]
+
+# The staged file being loaded, as a view over its parquet files or parts.
+STAGED_VIEW = "staged_file"
+
+LOADED_FILE_DDL = """
+CREATE TABLE IF NOT EXISTS loaded_file (
+    file_hash VARCHAR PRIMARY KEY,
+    table_name VARCHAR NOT NULL,
+    row_count BIGINT NOT NULL,
+    loaded_at TIMESTAMP NOT NULL DEFAULT current_timestamp
+)
+"""
+
+
+def load_staged_files(staged_dir: Path | str, database: Path | str) -> list[Outcome]:
+    """
+    Bulk-load every staged file in `staged_dir` into `database`.
+
+    Each file (or streamed parts directory) is loaded at most once, keyed on
+    its file hash (the file stem). Parquet is read with DuckDB's native scan;
+    Arrow IPC through polars. Fact files are merged incrementally, so a new
+    edition of a workbook only writes the rows it added or revised; files
+    are applied oldest first, so an older edition never revises a newer.
+    """
+    log.log_starting_warehouse_load(database)
+
+    outcomes = []
+    with duckdb.connect(str(database)) as con:
+        create_tables(con)
+        for file_path in writer.oldest_first(writer.staged_paths(staged_dir)):
+            outcome, message = load_file(con, file_path)
+            log.log_outcome(outcome, message)
+            outcomes.append(outcome)
+
+    log.log_staging_completed(outcomes)
+
+    return outcomes
+
+
+def create_tables(con: duckdb.DuckDBPyConnection) -> None:
+    for table in TABLES:
+        con.execute(create_table_sql(table))
+        index_cols = ", ".join(table.key)
+        con.execute(
+            f"CREATE INDEX IF NOT EXISTS {table.name}_key "
+            f"ON {table.name} ({index_cols})"
+        )
+    con.execute(FACT_CHANGE_DDL)
+    con.execute(LOADED_FILE_DDL)
+
+
+def create_table_sql(table: Table) -> str:
+    cols = [
+        f"{name} {duckdb_type(col.dtype.type)}" + ("" if col.nullable else " NOT NULL")
+        for name, col in table.schema.columns.items()
+    ]
+    if table.primary_key:
+        cols.append(f"PRIMARY KEY ({', '.join(table.key)})")
+    return (
+        f"CREATE TABLE IF NOT EXISTS {table.name} "
+        f"(source_hash VARCHAR NOT NULL, {', '.join(cols)})"
+    )
+
+
+def duckdb_type(dtype: pl.DataType) -> str:
+    if dtype.is_float():
+        return "DOUBLE"
+    if dtype == pl.UInt32:
+        return "UINTEGER"
+    if dtype.is_integer():
+        return "BIGINT"
+    return "VARCHAR"
+
+
+def load_file(con: duckdb.DuckDBPyConnection, file_path: Path) -> tuple[Outcome, str]:
+    file_hash = file_path.stem
+    try:
+        if is_loaded(con, file_hash):
+            return Outcome.SKIPPED, f"File '{file_path.name}' already loaded"
+        attach_staged(con, file_path)
+        table = match_table(con, file_path)
+        con.begin()
+        if table is FACT:
+            inserted, revised, unchanged = merge_facts(con, file_path, file_hash)
+            row_count = inserted + revised
+            detail = f"{inserted} inserted, {revised} revised, {unchanged} unchanged"
+        else:
+            row_count = insert_file(con, table, file_path, file_hash)
+            detail = f"{row_count} rows"
+        con.execute(
+            "INSERT INTO loaded_file (file_hash, table_name, row_count) "
+            "VALUES (?, ?, ?)",
+            [file_hash, table.name, row_count],
+        )
+        con.commit()
+        return Outcome.SUCCESS, f"'{file_path.name}' -> {table.name} ({detail})"
+    except KeyError:
+        return Outcome.SKIPPED, f"File '{file_path.name}' matches no warehouse table"
+    except duckdb.Error as err:
+        rollback(con)
+        return Outcome.FAILED, f"Failed to load '{file_path.name}': {err}"
+
+
+def is_loaded(con: duckdb.DuckDBPyConnection, file_hash: str) -> bool:
+    return bool(
+        con.execute(
+            "SELECT count(*) FROM loaded_file WHERE file_hash = ?", [file_hash]
+        ).fetchone()[0]
+    )
+
+
+def match_table(con: duckdb.DuckDBPyConnection, file_path: Path) -> Table:
+    """Return the table whose schema has exactly the columns of `file_path`."""
+    columns = {row[0] for row in con.execute(f"DESCRIBE {STAGED_VIEW}").fetchall()}
+    for table in TABLES:
+        if columns == set(table.schema.columns):
+            return table
+
+    raise KeyError(file_path.name)
+
+
+def insert_file(
+    con: duckdb.DuckDBPyConnection, table: Table, file_path: Path, file_hash: str
+) -> int:
+    cols = ", ".join(table.schema.columns)
+    verb = "INSERT OR REPLACE" if table.primary_key else "INSERT"
+    con.execute(
+        f"{verb} INTO {table.name} (source_hash, {cols}) "
+        f"SELECT ?, {cols} FROM {STAGED_VIEW} ORDER BY {', '.join(table.key)}",
+        [file_hash],
+    )
+    return con.execute(
+        f"SELECT count(*) FROM {table.name} WHERE source_hash = ?", [file_hash]
+    ).fetchone()[0]
+
+
+def merge_facts(
+    con: duckdb.DuckDBPyConnection, file_path: Path, file_hash: str
+) -> tuple[int, int, int]:
+    """
+    Merge a staged fact file into `fact`, writing only new and revised rows.
+
+    Staged rows are diffed against the stored facts with one anti/outer join
+    on the `FACT` key. Keys not yet stored are inserted; stored keys whose
+    `FACT_COMPARED` columns differ are updated in place and logged to
+    `fact_change` with the old and new value and both source hashes.
+    Identical rows are left alone. Returns (inserted, revised, unchanged).
+    """
+    cols = list(FACT.schema.columns)
+    on = " AND ".join(f"s.{col} = f.{col}" for col in FACT.key)
+    differs = " OR ".join(f"s.{col} IS DISTINCT FROM f.{col}" for col in FACT_COMPARED)
+    con.execute(
+        f"""
+        CREATE OR REPLACE TEMP TABLE incoming AS
+        SELECT
+            {", ".join(f"s.{col}" for col in cols)},
+            f.value AS previous_value,
+            f.source_hash AS previous_source_hash,
+            f.{FACT.key[0]} IS NULL AS is_new
+        FROM {STAGED_VIEW} s
+        LEFT JOIN fact f ON {on}
+        WHERE f.{FACT.key[0]} IS NULL OR {differs}
+        """
+    )
+    con.execute(
+        f"""
+        INSERT INTO fact_change (
+            {", ".join(FACT.key)}, previous_value, value,
+            previous_source_hash, source_hash, source
+        )
+        SELECT
+            {", ".join(FACT.key)}, previous_value, value,
+            previous_source_hash, ?, source
+        FROM incoming
+        WHERE NOT is_new
+        """,
+        [file_hash],
+    )
+    updated = [col for col in cols if col not in FACT.key]
+    con.execute(
+        f"""
+        UPDATE fact f
+        SET source_hash = ?, {", ".join(f"{col} = s.{col}" for col in updated)}
+        FROM incoming s
+        WHERE NOT s.is_new AND {on}
+        """,
+        [file_hash],
+    )
+    con.execute(
+        f"""
+        INSERT INTO fact (source_hash, {", ".join(cols)})
+        SELECT ?, {", ".join(cols)} FROM incoming
+        WHERE is_new
+        ORDER BY {", ".join(FACT.key)}
+        """,
+        [file_hash],
+    )
+    inserted, revised = con.execute(
+        "SELECT count(*) FILTER (is_new), count(*) FILTER (NOT is_new) FROM incoming"
+    ).fetchone()
+    staged = con.execute(f"SELECT count(*) FROM {STAGED_VIEW}").fetchone()[0]
+    con.execute("DROP TABLE incoming")
+
+    return inserted, revised, staged - inserted - revised
+
+
+def attach_staged(con: duckdb.DuckDBPyConnection, file_path: Path) -> None:
+    """
+    Expose the staged file or parts directory at `file_path` as `STAGED_VIEW`.
+
+    DuckDB has no built-in Arrow IPC reader, so IPC files are read by polars
+    and copied into a temporary table over the Arrow C stream interface.
+    """
+    paths = [str(path) for path in writer.part_paths(file_path)]
+    if file_path.suffix == writer.SUFFIXES["ipc"]:
+        con.register(
+            "staged_stream", ArrowStream(writer.scan_staged(file_path).collect())
+        )
+        con.execute(
+            "CREATE OR REPLACE TEMP TABLE staged_ipc AS SELECT * FROM staged_stream"
+        )
+        con.unregister("staged_stream")
+        source = "staged_ipc"
+    else:
+        source = f"read_parquet({sql_list(paths)})"
+    con.execute(f"CREATE OR REPLACE TEMP VIEW {STAGED_VIEW} AS SELECT * FROM {source}")
+
+
+class ArrowStream(NamedTuple):
+    """A polars frame as an Arrow C stream, which DuckDB scans without pyarrow."""
+
+    data: pl.DataFrame
+
+    def __arrow_c_stream__(self, requested_schema: object = None) -> object:
+        return self.data.__arrow_c_stream__(requested_schema)
+
+
+def sql_list(values: list[str]) -> str:
+    return (
+        "[" + ", ".join("'" + value.replace("'", "''") + "'" for value in values) + "]"
+    )
+
+
+def rollback(con: duckdb.DuckDBPyConnection) -> None:
+    try:
+        con.rollback()
+    except duckdb.TransactionException:
+        pass
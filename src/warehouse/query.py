@@ -0,0 +1,272 @@
+"""warehouse/query.py"""
+
+import re
+from collections.abc import Iterable
+from functools import lru_cache
+from pathlib import Path
+
+import duckdb
+import polars as pl
+
+from . import loader
+from pipeline import writer
+from utils import gss
+from utils.fingerprint import Fingerprint
+
+
+Filter = tuple[str, ...] | None
+# The staged files (by name and when they were staged) or loaded file hashes
+# that cached results were read from.
+Version = tuple[tuple[str, int], ...] | tuple[str, ...]
+
+HIERARCHY_COLUMNS = [
+    "local_authority_name",
+    "region_code",
+    "region_name",
+    "country_code",
+    "country_name",
+]
+FACT_COLUMNS = ["metric_group", "metric", "code", "unit", "period", "value"]
+
+
+class FactQuery:
+    """
+    Cached queries over staged facts joined to the local authority hierarchy.
+
+    Reads either the staged files in `staged_dir` or a DuckDB
+    warehouse at `database`. Filters are pushed down to the scan, and results
+    are kept in a bounded LRU cache that is cleared whenever a staged file is
+    added, removed or re-staged (or the set of loaded file hashes changes).
+    """
+
+    def __init__(
+        self,
+        staged_dir: Path | str | None = None,
+        database: Path | str | None = None,
+        cache_size: int = 128,
+    ):
+        if (staged_dir is None) == (database is None):
+            raise ValueError("Pass exactly one of 'staged_dir' or 'database'.")
+
+        self.staged_dir = Path(staged_dir) if staged_dir is not None else None
+        self.database = Path(database) if database is not None else None
+        self.version: Version | None = None
+        self.database_stamp: tuple[Fingerprint | None, ...] | None = None
+        self.database_version: tuple[str, ...] = ()
+        self.cached_run = lru_cache(maxsize=cache_size)(self.run)
+        self.layouts: dict[str, loader.Table | None] = {}
+
+    def metric(
+        self,
+        code: str,
+        local_authority_codes: Iterable[str] | None = None,
+        periods: Iterable[str] | None = None,
+        hierarchy: bool = True,
+    ) -> pl.DataFrame:
+        """Return metric `code` for the given LAs and periods (default: all)."""
+        return self.facts([code], local_authority_codes, periods, hierarchy)
+
+    def local_authority(
+        self,
+        local_authority_code: str,
+        periods: Iterable[str] | None = None,
+        hierarchy: bool = True,
+    ) -> pl.DataFrame:
+        """Return every metric for one LA."""
+        return self.facts(None, [local_authority_code], periods, hierarchy)
+
+    def facts(
+        self,
+        codes: Iterable[str] | None = None,
+        local_authority_codes: Iterable[str] | None = None,
+        periods: Iterable[str] | None = None,
+        hierarchy: bool = True,
+    ) -> pl.DataFrame:
+        version = self.current_version()
+        if version != self.version:
+            self.cached_run.cache_clear()
+            self.version = version
+
+        return self.cached_run(
+            as_filter(codes),
+            as_filter(local_authority_codes),
+            as_filter(periods),
+            hierarchy,
+        )
+
+    def current_version(self) -> Version:
+        if self.staged_dir is not None:
+            # A file re-staged in place keeps its name, but not its staged time.
+            return tuple(
+                (path.name, writer.staged_at(path))
+                for path in writer.staged_paths(self.staged_dir)
+            )
+
+        # Only re-read loaded_file when the database (or its WAL) has changed.
+        stamp = tuple(
+            Fingerprint.of(path) if path.exists() else None
+            for path in (
+                self.database,
+                self.database.with_name(f"{self.database.name}.wal"),
+            )
+        )
+        if stamp != self.database_stamp:
+            with duckdb.connect(str(self.database), read_only=True) as con:
+                rows = con.execute(
+                    "SELECT file_hash FROM loaded_file ORDER BY file_hash"
+                ).fetchall()
+            self.database_stamp = stamp
+            self.database_version = tuple(row[0] for row in rows)
+
+        return self.database_version
+
+    def run(
+        self,
+        codes: Filter,
+        local_authority_codes: Filter,
+        periods: Filter,
+        hierarchy: bool,
+    ) -> pl.DataFrame:
+        if self.staged_dir is not None:
+            return self.run_staged(codes, local_authority_codes, periods, hierarchy)
+        return self.run_duckdb(codes, local_authority_codes, periods, hierarchy)
+
+    def run_staged(
+        self,
+        codes: Filter,
+        local_authority_codes: Filter,
+        periods: Filter,
+        hierarchy: bool,
+    ) -> pl.DataFrame:
+        fact_files = self.staged_files(loader.FACT)
+        columns = ["local_authority_code", *FACT_COLUMNS]
+        if not fact_files:
+            return pl.DataFrame(
+                schema={
+                    col: pl.Float64 if col == "value" else pl.String for col in columns
+                }
+            )
+
+        facts = pl.concat(writer.scan_staged(path) for path in fact_files)
+        for col, values in [
+            ("code", codes),
+            ("local_authority_key", as_keys(local_authority_codes)),
+            ("period", periods),
+        ]:
+            if values is not None:
+                facts = facts.filter(pl.col(col).is_in(values))
+        # Editions of a workbook repeat its facts; as in the warehouse, the
+        # newest edition's row wins.
+        facts = facts.unique(loader.FACT.key, keep="last")
+        facts = facts.select(
+            "local_authority_key",
+            *[pl.col(col).cast(pl.String) for col in FACT_COLUMNS if col != "value"],
+            "value",
+        )
+
+        hierarchy_files = self.staged_files(loader.LOCAL_AUTHORITY)
+        attributes = []
+        if hierarchy and hierarchy_files:
+            attributes = HIERARCHY_COLUMNS
+            local_authorities = (
+                pl.concat(writer.scan_staged(path) for path in hierarchy_files)
+                .select("local_authority_key", *HIERARCHY_COLUMNS)
+                .unique("local_authority_key", keep="last", maintain_order=True)
+            )
+            facts = facts.join(local_authorities, on="local_authority_key", how="left")
+
+        # Keys sort in code order, so sorting on them matches the warehouse.
+        return (
+            facts.sort("code", "local_authority_key", "period")
+            .select(
+                gss.decode_expr(pl.col("local_authority_key")).alias(
+                    "local_authority_code"
+                ),
+                *attributes,
+                *FACT_COLUMNS,
+            )
+            .collect()
+        )
+
+    def run_duckdb(
+        self,
+        codes: Filter,
+        local_authority_codes: Filter,
+        periods: Filter,
+        hierarchy: bool,
+    ) -> pl.DataFrame:
+        columns = [f"{gss.decode_sql('f.local_authority_key')} AS local_authority_code"]
+        join = ""
+        if hierarchy:
+            columns += [f"l.{col}" for col in HIERARCHY_COLUMNS]
+            join = "LEFT JOIN local_authority l USING (local_authority_key)"
+        columns += [f"f.{col}" for col in FACT_COLUMNS]
+
+        conditions, params = [], []
+        for col, values in [
+            ("code", codes),
+            ("local_authority_key", as_keys(local_authority_codes)),
+            ("period", periods),
+        ]:
+            if values is not None:
+                # `IN ()` is a syntax error; an empty filter matches nothing.
+                placeholders = ", ".join("?" * len(values)) or "NULL"
+                conditions.append(f"f.{col} IN ({placeholders})")
+                params.extend(values)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+        with duckdb.connect(str(self.database), read_only=True) as con:
+            return pl.DataFrame(
+                con.sql(
+                    f"SELECT {', '.join(columns)} FROM fact f {join} {where} "
+                    "ORDER BY f.code, f.local_authority_key, f.period",
+                    params=params or None,
+                )
+            )
+
+    def staged_files(self, table: loader.Table) -> list[Path]:
+        """
+        Return the staged files whose columns match `table`, oldest first.
+
+        Files are ordered by when they were staged, so of two editions of a
+        workbook the newer comes last.
+        """
+        files = []
+        for file_path in writer.oldest_first(writer.staged_paths(self.staged_dir)):
+            if not writer.part_paths(file_path):
+                continue
+            # Staged files are content-addressed, so a layout never changes.
+            if file_path.name not in self.layouts:
+                self.layouts[file_path.name] = match_layout(file_path)
+            if self.layouts[file_path.name] is table:
+                files.append(file_path)
+
+        return files
+
+
+def match_layout(file_path: Path) -> loader.Table | None:
+    columns = set(writer.scan_staged(file_path).collect_schema())
+    for table in loader.TABLES:
+        if columns == set(table.schema.columns):
+            return table
+
+    return None
+
+
+def as_keys(local_authority_codes: Filter) -> tuple[int, ...] | None:
+    """Return the keys of `local_authority_codes`, which match no key if invalid."""
+    if local_authority_codes is None:
+        return None
+    return tuple(
+        gss.encode(code)
+        for code in local_authority_codes
+        if re.match(gss.GSS_CODE, code)
+    )
+
+
+def as_filter(values: Iterable[str] | None) -> Filter:
+    if values is None:
+        return None
+    if isinstance(values, str):
+        values = [values]
+    return tuple(sorted(set(values)))
@@ -0,0 +1,134 @@
+"""warehouse/rollup.py"""
+
+from pathlib import Path
+from typing import Literal
+
+import duckdb
+from loguru import logger
+
+from utils import gss
+
+
+Rule = Literal["sum", "weighted_mean", "median"]
+
+ROLLUP_TABLE = "fact_rollup"
+WEIGHT_CODE = "population"
+DEFAULT_RULE: Rule = "median"
+
+# How each metric code is aggregated from LAs up to regions and countries.
+# Rates and percentages are weighted by the LA's population; codes not listed
+# here use DEFAULT_RULE.
+AGGREGATION_RULES: dict[str, Rule] = {
+    "population": "sum",
+    "young_person_pct": "weighted_mean",
+    "adult_person_pct": "weighted_mean",
+    "elderly_person_pct": "weighted_mean",
+    "economic_inactivity_pct": "weighted_mean",
+    "employment_pct": "weighted_mean",
+    "unemployment_pct": "weighted_mean",
+    "claimant_pct": "weighted_mean",
+    "child_relative_poverty_pct": "weighted_mean",
+    "first_time_buyer_rate": "weighted_mean",
+    "gcse_attainment_pct": "weighted_mean",
+    "l3_plus_quals_pct": "weighted_mean",
+    "ks2_standard_skills_pct": "weighted_mean",
+    "no_quals_pct": "weighted_mean",
+    "female_halthy_life_exp": "weighted_mean",
+    "male_halthy_life_exp": "weighted_mean",
+    "gdhi": "weighted_mean",
+    "gdhi_index": "weighted_mean",
+}
+
+# Population is only published for some periods, so each fact is weighted by
+# the LA's latest population at or before its period, or failing that its
+# earliest. A group with no weights at all falls back to an unweighted mean.
+ROLLUP_SQL = f"""
+CREATE OR REPLACE TABLE {ROLLUP_TABLE} AS
+WITH rule AS (
+    SELECT unnest($codes::VARCHAR[]) AS code, unnest($rules::VARCHAR[]) AS rule
+),
+population AS (
+    SELECT local_authority_key, TRY_CAST(period AS INTEGER) AS year, value
+    FROM fact
+    WHERE code = $weight_code AND TRY_CAST(period AS INTEGER) IS NOT NULL
+),
+earliest_population AS (
+    SELECT local_authority_key, arg_min(value, year) AS value
+    FROM population
+    GROUP BY local_authority_key
+),
+weighted AS (
+    SELECT
+        f.*,
+        TRY_CAST(f.period AS INTEGER) AS year,
+        l.region_key,
+        l.region_name,
+        l.country_key,
+        l.country_name,
+        coalesce(r.rule, $default_rule) AS rule
+    FROM fact f
+    JOIN local_authority l USING (local_authority_key)
+    LEFT JOIN rule r USING (code)
+),
+facts AS (
+    SELECT w.*, coalesce(p.value, e.value) AS weight
+    FROM weighted w
+    ASOF LEFT JOIN population p
+        ON w.local_authority_key = p.local_authority_key AND w.year >= p.year
+    LEFT JOIN earliest_population e
+        ON w.local_authority_key = e.local_authority_key
+)
+SELECT
+    CASE WHEN GROUPING(region_key) = 0 THEN 'region' ELSE 'country' END AS level,
+    {gss.decode_sql("coalesce(region_key, country_key)")} AS area_code,
+    CASE
+        WHEN GROUPING(region_key) = 0 THEN any_value(region_name)
+        ELSE any_value(country_name)
+    END AS area_name,
+    any_value(metric_group) AS metric_group,
+    any_value(metric) AS metric,
+    code,
+    any_value(unit) AS unit,
+    period,
+    CASE
+        WHEN rule = 'weighted_mean' AND sum(weight) IS NULL THEN 'mean'
+        ELSE rule
+    END AS aggregation,
+    CASE rule
+        WHEN 'sum' THEN sum(value)
+        WHEN 'median' THEN median(value)
+        ELSE coalesce(sum(value * weight) / nullif(sum(weight), 0), avg(value))
+    END AS value,
+    count(*) AS local_authority_count
+FROM facts
+GROUP BY GROUPING SETS (
+    (code, period, rule, country_key, region_key),
+    (code, period, rule, country_key)
+)
+ORDER BY code, level, area_code, period
+"""
+
+
+def build_rollups(
+    database: Path | str, rules: dict[str, Rule] = AGGREGATION_RULES
+) -> int:
+    """
+    Materialise region and country rollups of every fact in `database`.
+
+    All codes, periods and both levels are computed in one grouped pass and
+    written to the `fact_rollup` table, replacing any previous rollups.
+    """
+    with duckdb.connect(str(database)) as con:
+        con.execute(
+            ROLLUP_SQL,
+            {
+                "codes": list(rules),
+                "rules": list(rules.values()),
+                "weight_code": WEIGHT_CODE,
+                "default_rule": DEFAULT_RULE,
+            },
+        )
+        row_count = con.execute(f"SELECT count(*) FROM {ROLLUP_TABLE}").fetchone()[0]
+
+    logger.info(f"Built {row_count} rollup rows in '{ROLLUP_TABLE}'.")
+    return row_count
@@ -0,0 +1,107 @@
+import duckdb
+import pytest
+
+from utils import gss
+from warehouse import derived
+from warehouse import loader
+
+
+HARTLEPOOL = gss.encode("E06000001")
+MIDDLESBROUGH = gss.encode("E06000002")
+NORTH_EAST = gss.encode("E12000001")
+NORTH_WEST = gss.encode("E12000002")
+# (code, LA key, period, value). Hartlepool's pay skips 2022.
+FACTS = [
+    ("pay", HARTLEPOOL, "2019", 10.0),
+    ("pay", HARTLEPOOL, "2020", 12.0),
+    ("pay", HARTLEPOOL, "2021", 15.0),
+    ("pay", HARTLEPOOL, "2023", 20.0),
+    ("pay", MIDDLESBROUGH, "2021", 18.0),
+    ("rent", HARTLEPOOL, "2021", 5.0),
+    ("rent", HARTLEPOOL, "2021/22", 6.0),
+]
+
+
+@pytest.fixture
+def database(tmp_path):
+    path = tmp_path / "warehouse.duckdb"
+    with duckdb.connect(str(path)) as con:
+        loader.create_tables(con)
+        con.executemany(
+            """
+            INSERT INTO local_authority (
+                source_hash, local_authority_key, local_authority_code,
+                local_authority_name, region_key, region_name, region_code,
+                country_key, country_code, country_name
+            )
+            VALUES ('hash', ?, ?, 'name', ?, 'region', ?, 0, 'E92000001', 'England')
+            """,
+            [
+                [key, gss.decode(key), NORTH_EAST, gss.decode(NORTH_EAST)]
+                for key in [HARTLEPOOL, MIDDLESBROUGH]
+            ],
+        )
+        con.executemany(
+            """
+            INSERT INTO fact (
+                source_hash, local_authority_key, metric_group, metric, code,
+                unit, source, period, value
+            )
+            VALUES ('hash', ?, 'group', ?, ?, 'unit', 'source', ?, ?)
+            """,
+            [[key, code, code, period, value] for code, key, period, value in FACTS],
+        )
+    return path
+
+
+def features(database, code, local_authority_key=HARTLEPOOL):
+    with duckdb.connect(str(database)) as con:
+        rows = con.execute(
+            f"SELECT period, feature, value FROM {derived.DERIVED_TABLE} "
+            "WHERE code = ? AND local_authority_key = ? ORDER BY period, feature",
+            [code, local_authority_key],
+        ).fetchall()
+    return {(period, feature): value for period, feature, value in rows}
+
+
+def test_features_follow_each_series_by_year(database):
+    derived.refresh_derived(database)
+
+    pay = features(database, "pay")
+    # Year-on-year changes need the previous year, so none are made for 2023.
+    assert pay[("2020", "yoy_change")] == 2.0
+    assert pay[("2021", "yoy_pct_change")] == 25.0
+    assert ("2023", "yoy_change") not in pay
+    # Rolling means need all three years in the window.
+    assert pay[("2021", "rolling_mean_3")] == pytest.approx(37 / 3)
+    assert ("2023", "rolling_mean_3") not in pay
+    assert pay[("2021", "national_rank")] == pay[("2021", "region_rank")] == 2.0
+    assert features(database, "pay", MIDDLESBROUGH)[("2021", "national_rank")] == 1
+    # Periods that are not years are skipped.
+    assert {period for period, _ in features(database, "rent")} == {"2021"}
+
+
+def test_only_codes_whose_inputs_changed_are_refreshed(database):
+    assert derived.refresh_derived(database)[0] == 2
+    assert derived.refresh_derived(database) == (0, 0)
+
+    with duckdb.connect(str(database)) as con:
+        con.execute("UPDATE fact SET value = 16 WHERE code = 'pay' AND period = '2021'")
+    assert derived.refresh_derived(database)[0] == 1
+    assert features(database, "pay")[("2021", "yoy_change")] == 4.0
+
+    # Region ranks depend on the hierarchy, so moving an LA refreshes its codes.
+    with duckdb.connect(str(database)) as con:
+        con.execute(
+            "UPDATE local_authority SET region_key = ? WHERE local_authority_key = ?",
+            [NORTH_WEST, MIDDLESBROUGH],
+        )
+    assert derived.refresh_derived(database)[0] == 1
+    assert features(database, "pay")[("2021", "region_rank")] == 1.0
+
+    assert derived.refresh_derived(database, ["yoy_change"])[0] == 2
+
+
+def test_unknown_features_are_rejected(database):
+    with pytest.raises(ValueError, match="Unknown derived features"):
+        derived.refresh_derived(database, ["yoy_change", "zscore"])
@@ -0,0 +1,54 @@
+import os
+
+import polars as pl
+
+from pipeline import writer
+from utils import gss
+from warehouse import export
+
+
+OLD_HASH = "f" * 64
+NEW_HASH = "0" * 64
+HARTLEPOOL = gss.encode("E06000001")
+
+
+def facts(values):
+    """Return staged facts for `values`, keyed by (LA key, period)."""
+    return pl.DataFrame(
+        {
+            "local_authority_key": [key for key, _ in values],
+            "metric_group": "earnings",
+            "metric": "median",
+            "code": "pay_med",
+            "unit": "gbp",
+            "source": "ashe",
+            "period": [period for _, period in values],
+            "value": list(values.values()),
+        },
+        schema_overrides={"local_authority_key": pl.UInt32},
+    )
+
+
+def test_export_wide_keeps_the_newest_value_per_code_la_and_period(tmp_path):
+    staged_dir = tmp_path / "staged"
+    # The older edition carries 2023, which the newer edition does not restate.
+    old_path = writer.write_staged(
+        facts({(HARTLEPOOL, "2023"): 1.0, (HARTLEPOOL, "2024"): 2.0}),
+        staged_dir / writer.staged_file_name(OLD_HASH),
+    )
+    os.utime(old_path, ns=(2_000, 2_000))
+    # The newer edition is a parts directory whose own mtime is older still; it
+    # was staged when its manifest was written.
+    new_path = staged_dir / writer.staged_file_name(NEW_HASH)
+    writer.clear_parts(new_path)
+    writer.write_staged(
+        facts({(HARTLEPOOL, "2024"): 2.5}), new_path / writer.part_name(0)
+    )
+    writer.finish_parts(new_path, [writer.part_name(0)], 1)
+    os.utime(new_path / writer.PARTS_MANIFEST, ns=(3_000, 3_000))
+    os.utime(new_path, ns=(1_000, 1_000))
+
+    export.export_wide(staged_dir, tmp_path / "export", hierarchy=False)
+
+    wide = export.read_wide(tmp_path / "export")
+    assert wide.rows() == [("E06000001", "2023", 1.0), ("E06000001", "2024", 2.5)]
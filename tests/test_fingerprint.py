@@ -0,0 +1,29 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from utils import fingerprint
+from utils.fingerprint import Fingerprint
+
+
+WORKERS = 4
+SAVES = 25
+
+
+def save_entries(path, worker):
+    cache = fingerprint.FingerprintCache(path)
+    for index in range(SAVES):
+        key = f"/raw/{worker}/{index}.xlsx"
+        cache.update({key: (Fingerprint(index, index, index), f"{worker}-{index}")})
+        cache.save()
+
+
+def test_concurrent_saves_keep_every_entry(tmp_path):
+    path = tmp_path / "fingerprints.json"
+    # Spawned, as forking a process running polars' threads may deadlock.
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(WORKERS, mp_context=context) as executor:
+        list(executor.map(save_entries, [path] * WORKERS, range(WORKERS)))
+
+    entries = fingerprint.load_entries(path)
+    assert len(entries) == WORKERS * SAVES
+    assert not path.with_name(path.name + fingerprint.LOCK_SUFFIX).exists()
@@ -0,0 +1,45 @@
+import duckdb
+import polars as pl
+import pytest
+
+from utils import gss
+
+
+CODES = ["E06000001", "E92000001", "W06000024", "W92000004", "Z99999999"]
+NOT_CODES = ["", "e06000001", "E0600001", "E060000011", "EE6000001", "1E6000001"]
+
+
+def test_decode_inverts_encode():
+    assert [gss.decode(gss.encode(code)) for code in CODES] == CODES
+
+
+def test_encode_preserves_order_and_fits_uint32():
+    keys = [gss.encode(code) for code in CODES]
+    assert keys == sorted(keys)
+    assert max(keys) <= 2**32 - 1
+
+
+@pytest.mark.parametrize("code", NOT_CODES)
+def test_encode_rejects_non_gss_codes(code):
+    with pytest.raises(ValueError):
+        gss.encode(code)
+
+
+def test_exprs_match_python():
+    data = pl.DataFrame({"code": CODES + NOT_CODES})
+    keys = data.select(gss.encode_expr(pl.col("code")).alias("key"))["key"]
+
+    assert keys.dtype == pl.UInt32
+    assert keys.to_list() == [gss.encode(code) for code in CODES] + [None] * len(
+        NOT_CODES
+    )
+    decoded = keys.head(len(CODES)).to_frame().select(gss.decode_expr(pl.col("key")))
+    assert decoded.to_series().to_list() == CODES
+
+
+def test_decode_sql_matches_python():
+    keys = ", ".join(str(gss.encode(code)) for code in CODES)
+    rows = duckdb.sql(
+        f"SELECT {gss.decode_sql('key')} FROM unnest([{keys}]::UINTEGER[]) t(key)"
+    ).fetchall()
+    assert [row[0] for row in rows] == CODES
@@ -0,0 +1,67 @@
+import os
+
+import duckdb
+import polars as pl
+
+from warehouse import loader
+
+
+OLD_HASH = "f" * 64
+NEW_HASH = "0" * 64
+
+
+def write_edition(path, values, staged_at):
+    pl.DataFrame(
+        {
+            "local_authority_key": [1, 2, 3][: len(values)],
+            "metric_group": "earnings",
+            "metric": "median",
+            "code": "pay_med",
+            "unit": "gbp",
+            "source": "ashe",
+            "period": "2024",
+            "value": values,
+        },
+        schema_overrides={"local_authority_key": pl.UInt32},
+    ).write_parquet(path)
+    os.utime(path, ns=(staged_at, staged_at))
+
+
+def test_load_staged_files_merges_editions_oldest_first(tmp_path):
+    # The newer edition's hash sorts first, so name order would apply it first.
+    write_edition(tmp_path / f"{OLD_HASH}.parquet", [1.0, 2.0], 1_000)
+    write_edition(tmp_path / f"{NEW_HASH}.parquet", [1.0, 2.5, 3.0], 2_000)
+    database = tmp_path / "warehouse.duckdb"
+
+    loader.load_staged_files(tmp_path, database)
+
+    with duckdb.connect(str(database)) as con:
+        facts = con.execute(
+            "SELECT local_authority_key, value, source_hash FROM fact ORDER BY 1"
+        ).fetchall()
+        changes = con.execute(
+            "SELECT local_authority_key, previous_value, value, "
+            "previous_source_hash, source_hash FROM fact_change"
+        ).fetchall()
+        row_counts = con.execute(
+            "SELECT file_hash, row_count FROM loaded_file ORDER BY loaded_at"
+        ).fetchall()
+
+    assert facts == [(1, 1.0, OLD_HASH), (2, 2.5, NEW_HASH), (3, 3.0, NEW_HASH)]
+    assert changes == [(2, 2.0, 2.5, OLD_HASH, NEW_HASH)]
+    assert row_counts == [(OLD_HASH, 2), (NEW_HASH, 2)]
+
+
+def test_merge_facts_counts_inserted_revised_and_unchanged(tmp_path):
+    write_edition(tmp_path / f"{OLD_HASH}.parquet", [1.0, 2.0], 1_000)
+    write_edition(tmp_path / f"{NEW_HASH}.parquet", [1.0, 2.5, 3.0], 2_000)
+
+    with duckdb.connect() as con:
+        loader.create_tables(con)
+        counts = []
+        for file_hash in [OLD_HASH, NEW_HASH]:
+            file_path = tmp_path / f"{file_hash}.parquet"
+            loader.attach_staged(con, file_path)
+            counts.append(loader.merge_facts(con, file_path, file_hash))
+
+    assert counts == [(2, 0, 0), (1, 1, 1)]
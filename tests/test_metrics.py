@@ -0,0 +1,31 @@
+import pytest
+
+from pipeline import metrics
+from pipeline.outcome import Outcome
+
+
+@pytest.mark.skipif(
+    not metrics.reset_peak_rss(), reason="RSS high-water mark cannot be reset"
+)
+def test_peak_rss_covers_only_the_file_being_staged(tmp_path):
+    large = metrics.Recorder(tmp_path / "large.xlsx")
+    # Filled rather than zeroed, so every page is resident.
+    buffer = b"\1" * 256 * 2**20
+    large_peak = large.finish(Outcome.SUCCESS).peak_rss_bytes
+    del buffer
+
+    small = metrics.Recorder(tmp_path / "small.xlsx")
+    small_peak = small.finish(Outcome.SUCCESS).peak_rss_bytes
+
+    assert large_peak - small_peak > 200 * 2**20
+
+
+def test_unknown_peak_rss_is_left_out_of_prometheus(tmp_path):
+    recorder = metrics.Recorder(tmp_path / "book.xlsx")
+    recorder.tracks_peak_rss = False
+    file_metrics = recorder.finish(Outcome.SUCCESS)
+
+    text = metrics.format_prometheus([file_metrics])
+
+    assert file_metrics.peak_rss_bytes is None
+    assert "# TYPE staging_peak_rss_bytes gauge\n# TYPE" in text
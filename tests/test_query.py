@@ -0,0 +1,87 @@
+import os
+
+import polars as pl
+import pytest
+
+from pipeline import writer
+from utils import gss
+from warehouse import loader
+from warehouse import query
+
+
+OLD_HASH = "f" * 64
+NEW_HASH = "0" * 64
+
+
+def write_facts(staged_dir, file_hash, value, staged_at):
+    path = writer.write_staged(
+        pl.DataFrame(
+            {
+                "local_authority_key": [gss.encode("E06000001")],
+                "metric_group": "earnings",
+                "metric": "median",
+                "code": "pay_med",
+                "unit": "gbp",
+                "source": "ashe",
+                "period": "2024",
+                "value": [value],
+            },
+            schema_overrides={"local_authority_key": pl.UInt32},
+        ),
+        staged_dir / writer.staged_file_name(file_hash),
+    )
+    os.utime(path, ns=(staged_at, staged_at))
+    return path
+
+
+def values(fact_query):
+    return fact_query.metric("pay_med", hierarchy=False)["value"].to_list()
+
+
+def test_repeated_queries_are_served_from_the_cache(tmp_path):
+    write_facts(tmp_path, OLD_HASH, 1.0, 1_000)
+    fact_query = query.FactQuery(staged_dir=tmp_path)
+
+    assert values(fact_query) == values(fact_query) == [1.0]
+    assert fact_query.cached_run.cache_info().hits == 1
+
+
+def test_cache_is_cleared_when_a_fact_file_is_added_or_removed(tmp_path):
+    write_facts(tmp_path, OLD_HASH, 1.0, 1_000)
+    fact_query = query.FactQuery(staged_dir=tmp_path)
+    assert values(fact_query) == [1.0]
+
+    new_path = write_facts(tmp_path, NEW_HASH, 2.0, 2_000)
+    assert values(fact_query) == [2.0]
+
+    new_path.unlink()
+    assert values(fact_query) == [1.0]
+
+
+def test_cache_is_cleared_when_a_fact_file_is_restaged_in_place(tmp_path):
+    write_facts(tmp_path, OLD_HASH, 1.0, 1_000)
+    fact_query = query.FactQuery(staged_dir=tmp_path)
+    assert values(fact_query) == [1.0]
+
+    write_facts(tmp_path, OLD_HASH, 1.5, 2_000)
+
+    assert values(fact_query) == [1.5]
+
+
+def test_cache_is_cleared_when_the_warehouse_loads_a_file(tmp_path):
+    staged_dir = tmp_path / "staged"
+    database = tmp_path / "warehouse.duckdb"
+    write_facts(staged_dir, OLD_HASH, 1.0, 1_000)
+    loader.load_staged_files(staged_dir, database)
+    fact_query = query.FactQuery(database=database)
+    assert values(fact_query) == [1.0]
+
+    write_facts(staged_dir, NEW_HASH, 2.0, 2_000)
+    loader.load_staged_files(staged_dir, database)
+
+    assert values(fact_query) == [2.0]
+
+
+def test_a_query_needs_exactly_one_source(tmp_path):
+    with pytest.raises(ValueError, match="exactly one"):
+        query.FactQuery()
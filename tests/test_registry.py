@@ -0,0 +1,48 @@
+import pytest
+
+from pipeline import registry
+
+
+FILE_HASH = "0" * 64
+MODULE = """
+from pipeline.registry import register_staging_pipeline
+
+@register_staging_pipeline({file_hash!r}, schema=None)
+def stage(source):
+    return None
+"""
+
+
+@pytest.fixture
+def pipelines(monkeypatch):
+    pipelines = registry.PipelineRegistry()
+    monkeypatch.setattr(registry, "staging_pipelines", pipelines)
+    return pipelines
+
+
+def write_module(tmp_path, monkeypatch, name, file_hash):
+    (tmp_path / f"{name}.py").write_text(MODULE.format(file_hash=file_hash))
+    monkeypatch.syspath_prepend(tmp_path)
+
+
+def test_lookup_imports_the_manifest_module(tmp_path, monkeypatch, pipelines):
+    write_module(tmp_path, monkeypatch, "registers_hash", FILE_HASH)
+    pipelines.manifest[FILE_HASH] = "registers_hash"
+
+    assert FILE_HASH in pipelines
+    assert pipelines[FILE_HASH].pipeline_fn.__module__ == "registers_hash"
+
+
+def test_module_not_registering_the_hash_raises_key_error(
+    tmp_path, monkeypatch, pipelines
+):
+    write_module(tmp_path, monkeypatch, "registers_other_hash", "f" * 64)
+    pipelines.manifest[FILE_HASH] = "registers_other_hash"
+
+    with pytest.raises(KeyError):
+        pipelines[FILE_HASH]
+
+
+def test_unknown_hash_raises_key_error(pipelines):
+    with pytest.raises(KeyError):
+        pipelines[FILE_HASH]
@@ -0,0 +1,122 @@
+import duckdb
+import pytest
+
+from utils import gss
+from warehouse import loader
+from warehouse import rollup
+
+
+ENGLAND = "E92000001"
+NORTH_EAST = "E12000001"
+NORTH_WEST = "E12000002"
+# LA code -> region code.
+LOCAL_AUTHORITIES = {
+    "E06000001": NORTH_EAST,
+    "E06000002": NORTH_EAST,
+    "E06000006": NORTH_WEST,
+}
+# (code, LA code, period, value). Population is published for 2020 and 2022
+# only, and never for the North West's LA.
+FACTS = [
+    ("population", "E06000001", "2020", 100.0),
+    ("population", "E06000002", "2020", 300.0),
+    ("population", "E06000001", "2022", 300.0),
+    ("population", "E06000002", "2022", 300.0),
+    ("employment_pct", "E06000001", "2019", 50.0),
+    ("employment_pct", "E06000002", "2019", 70.0),
+    ("employment_pct", "E06000001", "2021", 50.0),
+    ("employment_pct", "E06000002", "2021", 70.0),
+    ("employment_pct", "E06000006", "2021", 40.0),
+    ("employment_pct", "E06000001", "2022", 50.0),
+    ("employment_pct", "E06000002", "2022", 70.0),
+    ("median_pay", "E06000001", "2021", 1.0),
+    ("median_pay", "E06000002", "2021", 2.0),
+    ("median_pay", "E06000006", "2021", 9.0),
+]
+
+
+@pytest.fixture
+def database(tmp_path):
+    path = tmp_path / "warehouse.duckdb"
+    with duckdb.connect(str(path)) as con:
+        loader.create_tables(con)
+        for code, region_code in LOCAL_AUTHORITIES.items():
+            con.execute(
+                """
+                INSERT INTO local_authority (
+                    source_hash, local_authority_key, local_authority_code,
+                    local_authority_name, region_key, region_name, region_code,
+                    country_key, country_code, country_name
+                )
+                VALUES ('hash', ?, ?, ?, ?, ?, ?, ?, ?, 'England')
+                """,
+                [
+                    gss.encode(code),
+                    code,
+                    code,
+                    gss.encode(region_code),
+                    region_code,
+                    region_code,
+                    gss.encode(ENGLAND),
+                    ENGLAND,
+                ],
+            )
+        con.executemany(
+            """
+            INSERT INTO fact (
+                source_hash, local_authority_key, metric_group, metric, code,
+                unit, source, period, value
+            )
+            VALUES ('hash', ?, 'group', ?, ?, 'unit', 'source', ?, ?)
+            """,
+            [
+                [gss.encode(la_code), code, code, period, value]
+                for code, la_code, period, value in FACTS
+            ],
+        )
+    return path
+
+
+def rollups(database, code):
+    with duckdb.connect(str(database)) as con:
+        rows = con.execute(
+            "SELECT level, area_code, period, aggregation, value, "
+            "local_authority_count FROM fact_rollup WHERE code = ? "
+            "ORDER BY level, area_code, period",
+            [code],
+        ).fetchall()
+    return rows
+
+
+def test_rates_are_weighted_by_the_latest_population_at_their_period(database):
+    rollup.build_rollups(database)
+
+    assert rollups(database, "employment_pct") == [
+        ("country", ENGLAND, "2019", "weighted_mean", 65.0, 2),
+        # Halton has no population, so it carries no weight here.
+        ("country", ENGLAND, "2021", "weighted_mean", 65.0, 3),
+        ("country", ENGLAND, "2022", "weighted_mean", 60.0, 2),
+        # 2019 precedes any population, so the earliest (2020) is used; 2021
+        # uses 2020's; 2022 its own.
+        ("region", NORTH_EAST, "2019", "weighted_mean", 65.0, 2),
+        ("region", NORTH_EAST, "2021", "weighted_mean", 65.0, 2),
+        ("region", NORTH_EAST, "2022", "weighted_mean", 60.0, 2),
+        # No LA in the region has a population, so its mean is unweighted.
+        ("region", NORTH_WEST, "2021", "mean", 40.0, 1),
+    ]
+
+
+def test_counts_are_summed_and_other_codes_use_the_default_rule(database):
+    rollup.build_rollups(database)
+
+    assert rollups(database, "population") == [
+        ("country", ENGLAND, "2020", "sum", 400.0, 2),
+        ("country", ENGLAND, "2022", "sum", 600.0, 2),
+        ("region", NORTH_EAST, "2020", "sum", 400.0, 2),
+        ("region", NORTH_EAST, "2022", "sum", 600.0, 2),
+    ]
+    assert rollups(database, "median_pay") == [
+        ("country", ENGLAND, "2021", rollup.DEFAULT_RULE, 2.0, 3),
+        ("region", NORTH_EAST, "2021", rollup.DEFAULT_RULE, 1.5, 2),
+        ("region", NORTH_WEST, "2021", rollup.DEFAULT_RULE, 9.0, 1),
+    ]
@@ -0,0 +1,147 @@
+import polars as pl
+import pytest
+from pandera import polars as pa
+
+from pipeline import registry
+from pipeline import runner
+from pipeline import writer
+from pipeline.outcome import Outcome
+from staging import engine
+from utils import file_handler as fh
+
+
+MODULE = """
+import polars as pl
+from pandera import polars as pa
+
+from pipeline.registry import register_staging_pipeline
+
+
+hash = {file_hash!r}
+schema = pa.DataFrameSchema({{"x": pa.Column(pl.Int64)}}, strict=True)
+
+
+@register_staging_pipeline(hash, schema)
+def stage(source):
+    return pl.read_csv(source)
+"""
+
+
+def write_staging_package(tmp_path, monkeypatch, raw_paths):
+    package_dir = tmp_path / "fake_staging"
+    package_dir.mkdir()
+    (package_dir / "__init__.py").write_text("")
+    for raw_path in raw_paths:
+        module = MODULE.format(file_hash=fh.hash_file(raw_path))
+        (package_dir / f"{raw_path.stem}.py").write_text(module)
+    monkeypatch.syspath_prepend(tmp_path)
+    monkeypatch.setattr(registry, "staging_pipelines", registry.PipelineRegistry())
+    monkeypatch.setattr(registry, "staging_packages", set())
+    import fake_staging
+
+    registry.load_staging_pipelines(fake_staging)
+
+
+def test_parallel_staging_after_polars_has_started_its_thread_pool(
+    tmp_path, monkeypatch
+):
+    raw_dir = tmp_path / "raw"
+    raw_dir.mkdir()
+    raw_paths = []
+    for name in ["a", "b", "c"]:
+        raw_path = raw_dir / f"{name}.csv"
+        raw_path.write_text(f"x\n{len(raw_paths)}\n")
+        raw_paths.append(raw_path)
+    write_staging_package(tmp_path, monkeypatch, raw_paths)
+    # Forked workers would inherit the parent's running thread pool's locks.
+    pl.DataFrame({"x": range(100_000)}).sort("x", descending=True)
+
+    results = runner.stage_files(raw_dir, tmp_path / "staged", workers=3)
+
+    assert [result.outcome for result in results] == [Outcome.SUCCESS] * 3
+
+
+class PlanSpy:
+    """Stands in for a workbook's plan, recording the engine it is collected on."""
+
+    def __init__(self):
+        self.engines = []
+
+    def collect(self, engine="auto"):
+        self.engines.append(engine)
+        return pl.DataFrame({"x": [1]})
+
+
+@pytest.mark.parametrize(
+    ("streaming_engine", "expected"), [(False, "auto"), (True, "streaming")]
+)
+def test_stage_collects_on_the_engine_in_options(
+    tmp_path, monkeypatch, streaming_engine, expected
+):
+    raw_path = tmp_path / "book.xlsx"
+    raw_path.write_bytes(b"workbook")
+    plan = PlanSpy()
+    monkeypatch.setattr(engine, "build_plan", lambda source, spec: plan)
+    monkeypatch.setattr(registry, "staging_pipelines", registry.PipelineRegistry())
+    schema = pa.DataFrameSchema({"x": pa.Column(pl.Int64)})
+    registry.register_staging_pipeline(fh.hash_file(raw_path), schema)(
+        lambda source: engine.stage(source, spec=None)
+    )
+    options = runner.StageOptions(streaming_engine=streaming_engine)
+
+    result = runner.stage(raw_path, tmp_path / "staged", options=options)
+
+    assert result.outcome == Outcome.SUCCESS
+    assert plan.engines == [expected]
+
+
+def register_parts(raw_path, parts):
+    """Register a pipeline for `raw_path` whose `parts_fn` yields `parts`."""
+    schema = pa.DataFrameSchema({"x": pa.Column(pl.Int64)})
+    registry.register_staging_pipeline(
+        fh.hash_file(raw_path), schema, parts_fn=lambda source: iter(parts)
+    )(lambda source: pl.concat(parts))
+
+
+def test_streaming_stages_each_part_then_the_manifest(tmp_path, monkeypatch):
+    raw_path = tmp_path / "book.xlsx"
+    raw_path.write_bytes(b"workbook")
+    monkeypatch.setattr(registry, "staging_pipelines", registry.PipelineRegistry())
+    register_parts(raw_path, [pl.DataFrame({"x": [2, 1]}), pl.DataFrame({"x": [3]})])
+    options = runner.StageOptions(streaming=True)
+
+    result = runner.stage(raw_path, tmp_path / "staged", options=options)
+
+    staged_path = tmp_path / "staged" / writer.staged_file_name(fh.hash_file(raw_path))
+    assert result.outcome == Outcome.SUCCESS
+    assert result.metrics.rows_out == 3
+    assert writer.part_paths(staged_path) == [
+        staged_path / writer.part_name(0),
+        staged_path / writer.part_name(1),
+    ]
+    assert writer.scan_staged(staged_path).collect()["x"].to_list() == [2, 1, 3]
+
+
+def test_streaming_leaves_no_staged_file_when_a_part_fails(tmp_path, monkeypatch):
+    raw_path = tmp_path / "book.xlsx"
+    raw_path.write_bytes(b"workbook")
+    monkeypatch.setattr(registry, "staging_pipelines", registry.PipelineRegistry())
+    register_parts(raw_path, [pl.DataFrame({"x": [1]}), pl.DataFrame({"x": ["a"]})])
+    options = runner.StageOptions(streaming=True)
+
+    result = runner.stage(raw_path, tmp_path / "staged", options=options)
+
+    staged_path = tmp_path / "staged" / writer.staged_file_name(fh.hash_file(raw_path))
+    assert result.outcome == Outcome.FAILED
+    assert not writer.is_staged(staged_path)
+
+    # The next attempt clears the first part left by the failed one.
+    register_parts(raw_path, [pl.DataFrame({"x": [4]})])
+    result = runner.stage(raw_path, tmp_path / "staged", options=options)
+
+    assert result.outcome == Outcome.SUCCESS
+    assert sorted(path.name for path in staged_path.iterdir()) == [
+        writer.PARTS_MANIFEST,
+        writer.part_name(0),
+    ]
+    assert writer.scan_staged(staged_path).collect()["x"].to_list() == [4]
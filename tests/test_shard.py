@@ -0,0 +1,132 @@
+import json
+import os
+import subprocess
+import sys
+import time
+
+from pipeline import report
+from pipeline import shard
+from pipeline.metrics import FileMetrics
+from pipeline.outcome import Outcome
+
+
+def write_claim(path, host, pid, age=0.0):
+    path.write_text(json.dumps({"token": "theirs", "host": host, "pid": pid}))
+    claimed_at = time.time() - age
+    os.utime(path, (claimed_at, claimed_at))
+
+
+def dead_pid():
+    process = subprocess.Popen([sys.executable, "-c", "pass"])
+    process.wait()
+    return process.pid
+
+
+def test_claim_is_held_once_and_released(tmp_path):
+    path = tmp_path / "a.claim"
+    with shard.claim(path) as won:
+        assert won
+        with shard.claim(path) as won_again:
+            assert not won_again
+        assert path.exists()
+    assert not path.exists()
+
+
+def test_release_leaves_a_claim_it_does_not_hold(tmp_path):
+    path = tmp_path / "a.claim"
+    token = shard.acquire(path)
+    shard.release(path, "not-" + token)
+    assert shard.read_owner(path)["token"] == token
+
+
+def test_fresh_claim_on_another_host_is_not_broken(tmp_path):
+    path = tmp_path / "a.claim"
+    write_claim(path, "elsewhere", 1)
+    assert shard.acquire(path, stale_seconds=60) is None
+
+
+def test_stale_claim_is_broken_and_reclaimed(tmp_path):
+    path = tmp_path / "a.claim"
+    write_claim(path, "elsewhere", 1, age=120)
+    token = shard.acquire(path, stale_seconds=60)
+    assert token is not None
+    assert shard.read_owner(path)["token"] == token
+
+
+def test_claim_of_dead_local_worker_is_broken_at_once(tmp_path):
+    path = tmp_path / "a.claim"
+    write_claim(path, shard.socket.gethostname(), dead_pid())
+    assert shard.acquire(path, stale_seconds=60) is not None
+
+
+def test_stale_claim_being_broken_is_left_to_the_breaker(tmp_path):
+    path = tmp_path / "a.claim"
+    write_claim(path, "elsewhere", 1, age=120)
+    marker = tmp_path / f".a.claim.theirs{shard.BREAK_SUFFIX}"
+    marker.touch()
+
+    assert shard.acquire(path, stale_seconds=60) is None
+    assert shard.read_owner(path)["token"] == "theirs"
+
+
+def test_held_claim_is_kept_fresh(tmp_path):
+    path = tmp_path / "a.claim"
+    with shard.claim(path, stale_seconds=0.2) as won:
+        assert won
+        time.sleep(0.5)
+        assert time.time() - path.stat().st_mtime < 0.2
+        assert not shard.is_stale(path, 0.2)
+
+
+def write_worker_report(stage_dir, worker, *entries):
+    results = [
+        (
+            "",
+            FileMetrics(
+                file_name=file_name,
+                file_hash=file_name,
+                dataset="",
+                outcome=outcome,
+                phase_seconds={},
+                rows_in=0,
+                rows_out=0,
+                bytes_in=0,
+                bytes_out=0,
+                peak_rss_bytes=0,
+                finished_at=finished_at,
+            ),
+        )
+        for file_name, outcome, finished_at in entries
+    ]
+    report.write_report(results, stage_dir, "run", worker)
+
+
+def test_merge_reports_keeps_the_most_final_outcome(tmp_path):
+    write_worker_report(
+        tmp_path,
+        "w1",
+        ("a.xlsx", Outcome.SUCCESS, 1.0),
+        ("b.xlsx", Outcome.SKIPPED, 3.0),
+        ("c.xlsx", Outcome.FAILED, 1.0),
+    )
+    write_worker_report(
+        tmp_path,
+        "w2",
+        ("a.xlsx", Outcome.SKIPPED, 2.0),
+        ("b.xlsx", Outcome.FAILED, 2.0),
+        ("c.xlsx", Outcome.FAILED, 2.0),
+    )
+
+    merged = report.merge_reports(tmp_path, "run")
+
+    settled = {
+        entry["file_name"]: (entry["outcome"], entry["worker"])
+        for entry in merged["files"]
+    }
+    assert settled == {
+        "a.xlsx": (Outcome.SUCCESS, "w1"),
+        "b.xlsx": (Outcome.FAILED, "w2"),
+        "c.xlsx": (Outcome.FAILED, "w2"),
+    }
+    assert merged["outcomes"] == {Outcome.SUCCESS: 1, Outcome.FAILED: 2}
+    assert report.run_report_path(tmp_path, "run").exists()
@@ -0,0 +1,86 @@
+import os
+
+import polars as pl
+import pytest
+
+from utils import sheet_cache
+from utils import workbook
+
+
+FILE_HASH = "0" * 64
+OPTIONS = {"header_row": 1}
+SHEET = pl.DataFrame({"code": ["E06000001"], "2010": [1.0]})
+
+
+class FakeReader:
+    """Stands in for a fastexcel reader, counting the sheets it loads."""
+
+    def __init__(self):
+        self.loaded = []
+
+    def load_sheet(self, sheet_name, **read_options):
+        self.loaded.append(sheet_name)
+        return self
+
+    def to_polars(self):
+        return SHEET
+
+
+@pytest.fixture
+def reader(monkeypatch):
+    fake = FakeReader()
+    monkeypatch.setattr(workbook.fastexcel, "read_excel", lambda source: fake)
+    return fake
+
+
+def test_cached_sheets_are_read_without_parsing_the_workbook(tmp_path, reader):
+    cache = sheet_cache.SheetCache(tmp_path / "cache")
+    sheets = {"Data": OPTIONS}
+
+    with sheet_cache.use(cache, FILE_HASH):
+        first = workbook.read_sheets(tmp_path / "book.xlsx", sheets)
+    with sheet_cache.use(cache, FILE_HASH):
+        second = workbook.read_sheets(tmp_path / "book.xlsx", sheets)
+
+    assert reader.loaded == ["Data"]
+    assert first["Data"].equals(SHEET)
+    assert second["Data"].equals(SHEET)
+
+
+def test_entries_are_keyed_by_file_sheet_and_read_options(tmp_path):
+    cache = sheet_cache.SheetCache(tmp_path)
+    cache.put(FILE_HASH, "Data", OPTIONS, SHEET)
+
+    assert cache.get(FILE_HASH, "Data", OPTIONS).equals(SHEET)
+    assert cache.get("f" * 64, "Data", OPTIONS) is None
+    assert cache.get(FILE_HASH, "Other", OPTIONS) is None
+    assert cache.get(FILE_HASH, "Data", {"header_row": 2}) is None
+
+
+def test_options_with_a_function_are_not_cached(tmp_path):
+    cache = sheet_cache.SheetCache(tmp_path)
+    options = {"use_columns": lambda column: True}
+
+    cache.put(FILE_HASH, "Data", options, SHEET)
+
+    assert cache.get(FILE_HASH, "Data", options) is None
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_least_recently_used_entries_are_evicted_over_the_limit(tmp_path):
+    cache = sheet_cache.SheetCache(tmp_path, max_mb=1)
+    data = pl.DataFrame({"value": pl.zeros(50_000, eager=True)})
+    for i, sheet_name in enumerate(["used", "old", "new"]):
+        cache.put(FILE_HASH, sheet_name, OPTIONS, data)
+        path = cache.path(FILE_HASH, sheet_name, OPTIONS)
+        os.utime(path, ns=(i * 1_000, i * 1_000))
+    # Reading "used", the first written, makes it the most recently used.
+    cache.get(FILE_HASH, "used", OPTIONS)
+
+    old_size = cache.path(FILE_HASH, "old", OPTIONS).stat().st_size
+
+    # Each entry is ~400 KB, so evicting "old" brings the cache under 1 MB.
+    assert cache.evict() == old_size
+    assert sorted(tmp_path.iterdir()) == sorted(
+        cache.path(FILE_HASH, sheet_name, OPTIONS) for sheet_name in ["used", "new"]
+    )
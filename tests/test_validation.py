@@ -0,0 +1,93 @@
+import polars as pl
+import pytest
+from pandera import errors as pae
+
+from pipeline import validation
+from staging import schema
+
+
+def fact(**columns):
+    return pl.DataFrame(
+        {
+            "local_authority_key": [1, 2],
+            "metric_group": "earnings",
+            "metric": "median",
+            "code": "pay_med",
+            "unit": "gbp",
+            "source": "ashe",
+            "period": ["2010", "2011"],
+            "value": [1.0, 2.0],
+            **columns,
+        }
+    )
+
+
+def hierarchy(**columns):
+    return pl.DataFrame(
+        {
+            "local_authority_key": [1, 2],
+            "local_authority_code": ["E06000001", "E06000002"],
+            "local_authority_name": ["Hartlepool", "Middlesbrough"],
+            "region_key": 3,
+            "region_name": "North East",
+            "region_code": "E12000001",
+            "country_key": 4,
+            "country_code": "E92000001",
+            "country_name": "England",
+            **columns,
+        }
+    )
+
+
+def report(data, stage_schema, backend):
+    """Return the reason and failing values of the error `backend` raises."""
+    with pytest.raises(pae.SchemaError) as exc_info:
+        validation.validate(data, stage_schema, backend)
+    err = exc_info.value
+    failure_cases = err.failure_cases
+    if isinstance(failure_cases, pl.LazyFrame):
+        failure_cases = failure_cases.collect()
+    if isinstance(failure_cases, pl.DataFrame):
+        # Native reports also carry each failing row's index.
+        failure_cases = failure_cases.drop("index", strict=False).rows()
+
+    return err.reason_code, failure_cases
+
+
+@pytest.mark.parametrize(
+    ("data", "stage_schema"),
+    [
+        (fact(extra=1), schema.Fact),
+        (fact(value=["1.5", "n/a"]), schema.Fact),
+        (fact(local_authority_key=[-1, 2]), schema.Fact),
+        (fact(value=[1.0, None]), schema.Fact),
+        (fact(local_authority_key=[1, 1], period="2010"), schema.Fact),
+        (hierarchy(local_authority_key=[1, 1]), schema.LocalAuthorityHierarchy),
+        (hierarchy(region_name=[None, "North East"]), schema.LocalAuthorityHierarchy),
+    ],
+)
+def test_native_errors_match_pandera(data, stage_schema):
+    assert report(data, stage_schema, "native") == report(data, stage_schema, "pandera")
+
+
+def test_valid_frames_are_coerced_as_pandera_coerces_them():
+    data = fact()
+
+    native = validation.validate(data, schema.Fact, "native")
+    pandera = validation.validate(data, schema.Fact, "pandera")
+
+    assert native.schema == pandera.schema
+    assert native.equals(pandera)
+
+
+def test_lazy_validation_reports_every_failure():
+    data = fact(extra=1, value=[None, "n/a"])
+
+    with pytest.raises(validation.LazySchemaError) as exc_info:
+        validation.validate(data, schema.Fact, "native", lazy=True)
+
+    assert [err.reason_code for err in exc_info.value.schema_errors] == [
+        pae.SchemaErrorReason.COLUMN_NOT_IN_SCHEMA,
+        pae.SchemaErrorReason.DATATYPE_COERCION,
+        pae.SchemaErrorReason.SERIES_CONTAINS_NULLS,
+    ]
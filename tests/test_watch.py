@@ -0,0 +1,34 @@
+from pipeline import registry
+from pipeline import runner
+from pipeline import watch
+from pipeline.outcome import Outcome
+
+
+def test_failed_file_is_retried_without_changing(tmp_path, monkeypatch):
+    raw_dir = tmp_path / "raw"
+    raw_dir.mkdir()
+    (raw_dir / "a.xlsx").write_bytes(b"raw")
+    outcomes = iter([Outcome.FAILED, Outcome.SUCCESS])
+    staged = []
+
+    def stage(path, *_):
+        staged.append(path.name)
+        return runner.StageResult(next(outcomes), "", None)
+
+    monkeypatch.setattr(runner, "stage", stage)
+    watcher = watch.Watcher(raw_dir, tmp_path / "staged", settle=0)
+    for _ in range(6):
+        watcher.poll()
+
+    # Seen, staged and failed; seen again, staged and succeeded; then left.
+    assert staged == ["a.xlsx", "a.xlsx"]
+
+
+def test_warm_up_skips_modules_that_fail_to_import(monkeypatch):
+    pipelines = registry.PipelineRegistry()
+    pipelines.manifest["0" * 64] = "staging.no_such_module"
+    monkeypatch.setattr(registry, "staging_pipelines", pipelines)
+
+    watch.warm_up()
+
+    assert not dict.__contains__(pipelines, "0" * 64)
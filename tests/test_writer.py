@@ -0,0 +1,58 @@
+import polars as pl
+import pytest
+
+from pipeline import writer
+
+
+FACTS = pl.DataFrame(
+    {
+        "code": ["b", "a", "b", "a"],
+        "local_authority_key": [2, 2, 1, 1],
+        "period": ["2011", "2010", "2010", "2011"],
+        "value": [1.0, 2.0, 3.0, 4.0],
+    }
+)
+
+
+@pytest.mark.parametrize("output_format", ["parquet", "ipc"])
+def test_write_staged_sorts_rows_on_the_sort_key(tmp_path, output_format):
+    path = tmp_path / writer.staged_file_name("0" * 64, output_format)
+
+    writer.write_staged(FACTS, path, output_format)
+
+    staged = writer.scan_staged(path).collect()
+    assert staged.equals(FACTS.sort(writer.SORT_KEY))
+    assert list(tmp_path.iterdir()) == [path]
+
+
+def test_write_staged_sorts_on_the_sort_key_columns_present(tmp_path):
+    path = tmp_path / "staged.parquet"
+
+    writer.write_staged(FACTS.drop("code"), path)
+
+    assert pl.read_parquet(path).equals(
+        FACTS.drop("code").sort("local_authority_key", "period")
+    )
+
+
+def test_failed_write_leaves_the_previous_file_in_place(tmp_path, monkeypatch):
+    path = tmp_path / "staged.parquet"
+    writer.write_staged(FACTS, path)
+    before = path.read_bytes()
+
+    def write_half_then_fail(data, file, **kwargs):
+        file.write_bytes(b"PAR1")
+        raise OSError("disk full")
+
+    monkeypatch.setattr(pl.DataFrame, "write_parquet", write_half_then_fail)
+
+    with pytest.raises(OSError, match="disk full"):
+        writer.write_staged(FACTS.head(1), path)
+
+    assert path.read_bytes() == before
+    assert list(tmp_path.iterdir()) == [path]
+
+
+def test_write_staged_rejects_unknown_formats(tmp_path):
+    with pytest.raises(ValueError, match="Unsupported staged output format"):
+        writer.write_staged(FACTS, tmp_path / "staged.csv", "csv")
@@ -0,0 +1,167 @@
+import zipfile
+
+import fastexcel
+import pytest
+
+from staging import engine
+from utils import xlsx_probe
+
+
+MAIN = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+REL = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+PACKAGE = "http://schemas.openxmlformats.org/package/2006"
+SHEET_TYPE = f"{REL}/worksheet"
+CONTENT_TYPES = f"""<?xml version="1.0" encoding="UTF-8"?>
+<Types xmlns="{PACKAGE}/content-types">
+<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>
+<Default Extension="xml" ContentType="application/xml"/>
+<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>
+<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>
+</Types>"""
+ROOT_RELS = f"""<?xml version="1.0" encoding="UTF-8"?>
+<Relationships xmlns="{PACKAGE}/relationships">
+<Relationship Id="rId1" Type="{REL}/officeDocument" Target="xl/workbook.xml"/>
+</Relationships>"""
+WORKBOOK = f"""<?xml version="1.0" encoding="UTF-8"?>
+<workbook xmlns="{MAIN}" xmlns:r="{REL}">
+<sheets><sheet name="Data" sheetId="1" r:id="rId1"/></sheets>
+</workbook>"""
+WORKBOOK_RELS = f"""<?xml version="1.0" encoding="UTF-8"?>
+<Relationships xmlns="{PACKAGE}/relationships">
+<Relationship Id="rId1" Type="{SHEET_TYPE}" Target="worksheets/sheet1.xml"/>
+</Relationships>"""
+
+
+def write_workbook(path, cells, dimension):
+    """Write a one-sheet workbook with inline string `cells`, keyed by ref."""
+    rows: dict[int, list[str]] = {}
+    for ref, text in cells.items():
+        row = int(ref.lstrip("ABCDEFGHIJKLMNOPQRSTUVWXYZ"))
+        if text is None:
+            rows.setdefault(row, []).append(f'<c r="{ref}" s="1"/>')
+        else:
+            rows.setdefault(row, []).append(
+                f'<c r="{ref}" t="inlineStr"><is><t>{text}</t></is></c>'
+            )
+    sheet_data = "".join(
+        f'<row r="{row}">{"".join(row_cells)}</row>'
+        for row, row_cells in sorted(rows.items())
+    )
+    dimension = f'<dimension ref="{dimension}"/>' if dimension else ""
+    sheet = (
+        f'<?xml version="1.0" encoding="UTF-8"?><worksheet xmlns="{MAIN}">'
+        f"{dimension}<sheetData>{sheet_data}</sheetData></worksheet>"
+    )
+    with zipfile.ZipFile(path, "w") as zf:
+        zf.writestr("[Content_Types].xml", CONTENT_TYPES)
+        zf.writestr("_rels/.rels", ROOT_RELS)
+        zf.writestr("xl/workbook.xml", WORKBOOK)
+        zf.writestr("xl/_rels/workbook.xml.rels", WORKBOOK_RELS)
+        zf.writestr("xl/worksheets/sheet1.xml", sheet)
+
+
+HEADER = {"C1": "code", "E1": "2010", "C2": "E06000004", "E2": "1"}
+
+
+@pytest.mark.parametrize(
+    ("cells", "dimension", "header_row"),
+    [
+        # A value left of the header, below the probed rows.
+        ({**HEADER, "A6": "note"}, "A1:E6", 0),
+        # The same, under a stale dimension.
+        ({**HEADER, "A6": "note"}, "C1:E6", 0),
+        ({**HEADER, "A6": "note"}, None, 0),
+        # A cell with only a style does not start the range.
+        ({**HEADER, "A1": None}, "A1:E2", 0),
+        # Empty leading rows: header row 0 is the first row with a value.
+        ({"A3": "code", "B3": "2010", "A4": "E06000004", "B4": "1"}, "A1:B4", 0),
+        # A title above the header, skipped by row or by default.
+        ({"A1": "Title", "B3": "code", "C3": "2010", "B4": "E06000004"}, None, 2),
+        ({"A1": "Title", "B3": "code", "C3": "2010", "B4": "E06000004"}, None, 0),
+        # A header row counted from the top of the sheet, even if empty.
+        ({"A3": "code", "B3": "2010", "A4": "E06000004", "B4": "1"}, None, 1),
+    ],
+)
+def test_header_names_match_fastexcel(tmp_path, cells, dimension, header_row):
+    path = tmp_path / "book.xlsx"
+    write_workbook(path, cells, dimension)
+
+    with xlsx_probe.WorkbookProbe(path) as probe:
+        columns = engine.header_names(*probe.header("Data", header_row))
+
+    sheet = fastexcel.read_excel(path).load_sheet_by_name("Data", header_row=header_row)
+    # The probe stops short of the sheet's full width, so it leaves out the
+    # trailing unnamed columns, which no spec can require.
+    expected = sheet.to_polars().columns
+    while expected and expected[-1].startswith("__UNNAMED__"):
+        expected.pop()
+    assert columns == expected
+
+
+ODS_OFFICE = "urn:oasis:names:tc:opendocument:xmlns:office:1.0"
+ODS_TABLE = "urn:oasis:names:tc:opendocument:xmlns:table:1.0"
+ODS_TEXT = "urn:oasis:names:tc:opendocument:xmlns:text:1.0"
+ODS_MIMETYPE = "application/vnd.oasis.opendocument.spreadsheet"
+ODS_MANIFEST = f"""<?xml version="1.0" encoding="UTF-8"?>
+<manifest:manifest xmlns:manifest="urn:oasis:names:tc:opendocument:xmlns:manifest:1.0">
+<manifest:file-entry manifest:full-path="/" manifest:media-type="{ODS_MIMETYPE}"/>
+<manifest:file-entry manifest:full-path="content.xml" manifest:media-type="text/xml"/>
+</manifest:manifest>"""
+
+
+def write_ods(path, rows):
+    """Write a one-sheet ods workbook of string `rows`."""
+    table_rows = "".join(
+        "<table:table-row>"
+        + "".join(
+            f'<table:table-cell office:value-type="string"><text:p>{text}</text:p>'
+            "</table:table-cell>"
+            for text in row
+        )
+        + "</table:table-row>"
+        for row in rows
+    )
+    content = (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        f'<office:document-content xmlns:office="{ODS_OFFICE}" '
+        f'xmlns:table="{ODS_TABLE}" xmlns:text="{ODS_TEXT}" office:version="1.2">'
+        '<office:body><office:spreadsheet><table:table table:name="Data">'
+        f"{table_rows}</table:table></office:spreadsheet></office:body>"
+        "</office:document-content>"
+    )
+    with zipfile.ZipFile(path, "w") as zf:
+        zf.writestr("mimetype", ODS_MIMETYPE, compress_type=zipfile.ZIP_STORED)
+        zf.writestr("META-INF/manifest.xml", ODS_MANIFEST)
+        zf.writestr("content.xml", content)
+
+
+SPEC = engine.WorkbookSpec(
+    metric_group="test",
+    sheet_metric={"Data": {"metric": "m", "code": "c", "unit": "u"}},
+    local_authority_col="code",
+    read_options={},
+)
+
+
+def test_check_structure_reads_header_below_empty_rows(tmp_path):
+    path = tmp_path / "book.xlsx"
+    write_workbook(path, {"A3": "code", "B3": "2010", "A4": "E06000004"}, None)
+
+    assert engine.check_structure(path, SPEC) == []
+
+
+def test_check_structure_reads_other_formats_through_fastexcel(tmp_path):
+    path = tmp_path / "book.ods"
+    write_ods(path, [["code", "2010"], ["E06000004", "1"]])
+    assert engine.check_structure(path, SPEC) == []
+
+    write_ods(path, [["area", "2010"], ["E06000004", "1"]])
+    assert engine.check_structure(path, SPEC) == [
+        (
+            "Sheet 'Data' header row 0 has no column matching 'code'; "
+            "found ['area', '2010']"
+        )
+    ]
+    assert engine.check_structure(path, SPEC._replace(sheet_metric={"Other": {}})) == [
+        "Sheet 'Other' not found; found ['Data']"
+    ]